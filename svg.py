@@ -1,35 +1,70 @@
 
-from PyQt5.QtGui import *
-from PyQt5.QtWidgets import *
-from PyQt5.QtCore import *
-from PyQt5.QtSvg import *
-from lxml import etree
-from time import time
-from math import cos, sin, pi, sqrt
+from PyQt5.QtGui import QBrush, QColor, QFont, QGuiApplication, QPainter, QPainterPath, QPalette, QPixmap, \
+    QTransform
+from PyQt5.QtWidgets import QApplication, QFrame, QGraphicsItem, QGraphicsScene, QGraphicsView, QGridLayout, \
+    QMainWindow, QStatusBar, QWidget
+from PyQt5.QtCore import Qt, QByteArray, QCoreApplication, QElapsedTimer, QEvent, QFile, QObject, QPointF, QRectF, \
+    QRunnable, QSize, QSizeF, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtSvg import QGraphicsSvgItem, QSvgRenderer
+from time import time, perf_counter
+from math import cos, sin, tan, radians, ceil, pi
+from copy import deepcopy
+from os.path import splitext, getsize
+from io import BytesIO
 from re import compile
-
-# lookup dictionary for svg element transform tag parsing
-rx_dict = {
-    'translate': compile(r'translate\((?P<translate>[\d.\s]+)\)'),
-    'scale': compile(r'scale\((?P<scale>[\d.\s]+)\)'),
-    'rotate': compile(r'rotate\((?P<rotate>[\d.\s]+)\)'),
-    'matrix': compile(r'matrix\((?P<matrix>[-\d.\s]+)\)')
+from functools import lru_cache
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from weakref import finalize
+from svgCache import DiagramCache
+from svgPool import RendererPool, document_key
+from svgTiles import TilePyramid
+from svgTween import TweenEngine
+from svgIndex import WaypointIndex
+from svgCull import ViewportCuller
+from svgBounds import BoundsTable
+from svgProfile import FrameProfiler
+from svgMotion import KineticMotion
+from svgWatch import FileWatcher
+from svgLog import log, gate, event, configure_from_env, TRACE, DEBUG
+from svgLazy import lazy_import
+from svgLod import SimplifiedPaths, parse_polylines
+
+# parsed on the load path only, which runs on the loader's pool: a viewer's window is up before lxml is imported
+etree = lazy_import('lxml.etree')
+
+SVG_NS = '{http://www.w3.org/2000/svg}'
+XLINK_HREF = '{http://www.w3.org/1999/xlink}href'
+
+# svg transform-list tokenizer: function name | number (sign, exponent) | punctuation, commas included
+rx_transform_token = compile(r'\s*(?:([A-Za-z]+)|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|([(),]))')
+transform_arity = {
+    'matrix': (6,),
+    'translate': (1, 2),
+    'scale': (1, 2),
+    'rotate': (1, 3),
+    'skewX': (1,),
+    'skewY': (1,),
 }
 
-# human-readable key-event to keymap interpreter
-keymap = {}
-for key, value in vars(Qt).items():
-    if isinstance(value, Qt.Key):
-        keymap[value] = key.partition('_')[2]
-
-keymap_modifiers = {
-    Qt.ControlModifier: keymap[Qt.Key_Control],
-    Qt.AltModifier: keymap[Qt.Key_Alt],
-    Qt.ShiftModifier: keymap[Qt.Key_Shift],
-    Qt.MetaModifier: keymap[Qt.Key_Meta],
-    Qt.GroupSwitchModifier: keymap[Qt.Key_AltGr],
-    Qt.KeypadModifier: keymap[Qt.Key_NumLock],
-}
+# human-readable key-event to keymap interpreter: key names by Qt.Key, and the modifier names, built from
+# walking vars(Qt) on the first key event instead of on import
+@lru_cache(maxsize=None)
+def key_names():
+    keymap = {}
+    for name, value in vars(Qt).items():
+        if isinstance(value, Qt.Key):
+            keymap[value] = name.partition('_')[2]
+
+    keymap_modifiers = {
+        Qt.ControlModifier: keymap[Qt.Key_Control],
+        Qt.AltModifier: keymap[Qt.Key_Alt],
+        Qt.ShiftModifier: keymap[Qt.Key_Shift],
+        Qt.MetaModifier: keymap[Qt.Key_Meta],
+        Qt.GroupSwitchModifier: keymap[Qt.Key_AltGr],
+        Qt.KeypadModifier: keymap[Qt.Key_NumLock],
+    }
+    return keymap, keymap_modifiers
 
 
 # simple easing function for custom non-qt animator class ItemAnim
@@ -46,64 +81,1000 @@ def d_ease(t, d):
     return sin(pi * t / d)
 
 
+# split a transform list into [(name, [args]), ...] in one scan, None if it breaks the grammar.
+# a comma may only stand between two arguments or between two transforms, one at a time
+def transform_ops(text):
+    ops = []
+    name = None
+    args = None
+    # a comma was read: a number (inside the parentheses) or a name (after them) has to follow
+    comma = False
+    pos = 0
+    while True:
+        m = rx_transform_token.match(text, pos)
+        if m is None:
+            break
+        pos = m.end()
+        word, number, punct = m.groups()
+        if word is not None:
+            if name is not None or word not in transform_arity:
+                return None
+            name = word
+        elif number is not None:
+            if args is None:
+                return None
+            args.append(float(number))
+        elif punct == ',':
+            if comma or not (args or (name is None and ops)):
+                return None
+            comma = True
+            continue
+        elif punct == '(':
+            if name is None or args is not None:
+                return None
+            args = []
+        else:
+            if comma or args is None or len(args) not in transform_arity[name]:
+                return None
+            ops.append((name, args))
+            name = None
+            args = None
+        comma = False
+
+    if comma or name is not None or text[pos:].strip():
+        return None
+    return ops
+
+
+# compose a transform list into (m11, m12, m21, m22, dx, dy), memoized since generated diagrams repeat them heavily.
+# an invalid list is ignored as a whole, as the svg spec asks.
+@lru_cache(maxsize=4096)
+def transform_matrix(text):
+    transform = QTransform()
+    ops = transform_ops(text) if text else None
+    for name, args in ops or ():
+        if name == 'matrix':
+            t = QTransform(*args)
+        elif name == 'translate':
+            t = QTransform.fromTranslate(args[0], args[1] if len(args) > 1 else 0.0)
+        elif name == 'scale':
+            t = QTransform.fromScale(args[0], args[1] if len(args) > 1 else args[0])
+        elif name == 'rotate':
+            t = QTransform().rotate(args[0])
+            if len(args) == 3:
+                t = QTransform.fromTranslate(-args[1], -args[2]) * t * QTransform.fromTranslate(args[1], args[2])
+        elif name == 'skewX':
+            t = QTransform(1.0, 0.0, tan(radians(args[0])), 1.0, 0.0, 0.0)
+        else:
+            t = QTransform(1.0, tan(radians(args[0])), 0.0, 1.0, 0.0, 0.0)
+        # svg lists apply right to left, QTransform products left to right
+        transform = t * transform
+    return transform.m11(), transform.m12(), transform.m21(), transform.m22(), transform.dx(), transform.dy()
+
+
+def parse_transform(text):
+    return QTransform(*transform_matrix(text))
+
+
 # Easing Equations in Python https://gist.github.com/th0ma5w/9883420
 def key_event_to_string(k_evt):
+    keymap, keymap_modifiers = key_names()
     sequence = []
     for modifier, text in keymap_modifiers.items():
         if k_evt.modifiers() & modifier:
             sequence.append(text)
     k_evt_key = keymap.get(k_evt.key(), k_evt.text())
-    if key not in sequence:
+    # a lone modifier press names itself once
+    if k_evt_key not in sequence:
         sequence.append(k_evt_key)
     return sequence
 
 
-# custom non-qt animator class
-class SvgLayerAnimator(QPointF):
+# attributes a <use> hands on to the placement <g> that replaces it
+use_placement_attributes = ('x', 'y', 'width', 'height', 'transform')
+
+
+# '#id' symbol reference of a <use>, None for external or missing links
+def use_target(use):
+    href = use.get(XLINK_HREF) or use.get('href')
+    if not href or href[0] != '#':
+        return None
+    return href[1:]
+
+
+# id for the next copy of symbol uid: the first copy keeps the symbol id, repeats get a numbered suffix
+# that does not collide with any id in `taken`
+def next_fax_id(uid, expanded, taken):
+    n = expanded.get(uid, 0)
+    fax_id = uid
+    if n:
+        fax_id = '%s-%d' % (uid, n)
+        while fax_id in taken:
+            n += 1
+            fax_id = '%s-%d' % (uid, n)
+    expanded[uid] = n + 1
+    return fax_id
+
+
+# url(#id) references in presentation attributes and style
+rx_url_reference = compile(r'url\(\s*#([^)\s]+)\s*\)')
+
+
+# ids inside the copy `fax` of a symbol's content get the copy's id in front, so copies do not repeat them.
+# references from within the copy to those ids (href, url(#id)) follow
+def scope_ids(fax, fax_id):
+    ids = {}
+    for node in fax.iterdescendants(etree.Element):
+        node_id = node.get('id')
+        if node_id is not None:
+            ids[node_id] = '%s.%s' % (fax_id, node_id)
+            node.set('id', ids[node_id])
+    if not ids:
+        return
+
+    def scoped_url(m):
+        return 'url(#%s)' % ids.get(m.group(1), m.group(1))
+
+    for node in fax.iter(etree.Element):
+        for att, value in node.items():
+            if att in (XLINK_HREF, 'href'):
+                if value[:1] == '#' and value[1:] in ids:
+                    node.set(att, '#' + ids[value[1:]])
+            elif 'url(' in value:
+                node.set(att, rx_url_reference.sub(scoped_url, value))
+
+
+# placement <g> (the use's x/y/transform) around a copy of the symbol's content, ids scoped to fax_id
+def symbol_placement(use, fax_id, symbol, nsmap=None):
+    placement = etree.Element(SVG_NS + 'g', nsmap=nsmap)
+    for att in use_placement_attributes:
+        value = use.get(att)
+        if value is not None:
+            placement.set(att, value)
+    symbol_fax = etree.SubElement(placement, SVG_NS + 'g')
+    symbol_fax.set('id', fax_id)
+    for g in symbol:
+        symbol_fax.append(deepcopy(g))
+    scope_ids(symbol_fax, fax_id)
+    return placement
+
+
+# uses of symbols inside symbols ({id: symbol}) become placements right where they are, innermost first, so every
+# copy of a symbol comes out the same whichever of its uses the document has first. a use through which a symbol
+# would contain itself is dropped
+def expand_nested_uses(symbols):
+    done = set()
+    for uid in symbols:
+        expand_symbol(uid, symbols, done, [])
+
+
+def expand_symbol(uid, symbols, done, path):
+    if uid in done:
+        return
+    symbol = symbols[uid]
+    path.append(uid)
+    taken = set(node.get('id') for node in symbol.iter(etree.Element))
+    expanded = {}
+    for use in list(symbol.iter(SVG_NS + 'use')):
+        inner = use_target(use)
+        if inner not in symbols:
+            continue
+        parent = use.getparent()
+        if inner in path:
+            parent.remove(use)
+            continue
+        expand_symbol(inner, symbols, done, path)
+        placement = symbol_placement(use, next_fax_id(inner, expanded, taken), symbols[inner])
+        fold_offset(placement)
+        placement.tail = use.tail
+        parent.replace(use, placement)
+    path.pop()
+    done.add(uid)
+
+
+# one id index over the tree, and every use outside symbols resolved against it: [(symbol id, use, symbol), ...]
+# in document order. uses inside symbols are expanded into them first (expand_nested_uses). non-symbol references
+# are left out, QSvgRenderer resolves those itself
+def symbol_uses(root):
+    index = {}
+    uses = []
+    for node in root.iter(etree.Element):
+        node_id = node.get('id')
+        if node_id is not None and node_id not in index:
+            index[node_id] = node
+        if node.tag == SVG_NS + 'use':
+            uses.append(node)
+
+    symbols = dict((uid, node) for uid, node in index.items() if node.tag == SVG_NS + 'symbol')
+    expand_nested_uses(symbols)
+    found = []
+    for use in uses:
+        uid = use_target(use)
+        # nested uses have left the tree
+        if uid in symbols and use.getparent() is not None:
+            found.append((uid, use, symbols[uid]))
+    return index, found
+
+
+# single-pass <use>/<symbol> expansion: each use of a symbol becomes a symbol_placement in symbols_layer.
+# symbols are dropped only once all their uses are expanded, symbols only used by other symbols stay.
+# `found` is symbol_uses(root), when the caller has it. -> the expanded uses, as symbol_uses lists them
+def resolve_uses(root, symbols_layer, found=None):
+    index, uses = found or symbol_uses(root)
+    expanded = {}
+    for uid, use, symbol in uses:
+        fax_id = next_fax_id(uid, expanded, index)
+        index.setdefault(fax_id, symbol)
+        symbols_layer.append(symbol_placement(use, fax_id, symbol))
+        use.getparent().remove(use)
+
+    for uid in expanded:
+        symbol = index[uid]
+        symbol.getparent().remove(symbol)
+
+    return uses
+
+
+# user units per absolute unit, at the 96 dpi QSvgRenderer assumes
+length_units = {'': 1.0, 'px': 1.0, 'pt': 96.0 / 72.0, 'pc': 16.0, 'in': 96.0, 'cm': 96.0 / 2.54, 'mm': 96.0 / 25.4}
+rx_length = compile(r'\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([a-z]*)\s*$')
+
+
+# an svg length attribute in user units. lengths relative to fonts or to the viewport (em, ex, %) cannot be
+# resolved here and count as 0, as does anything that is no length at all
+def svg_length(text):
+    if text is None:
+        return 0.0
+    match = rx_length.match(text)
+    if match is None or match.group(2) not in length_units:
+        log.debug('length ignored: %r', text)
+        return 0.0
+    return float(match.group(1)) * length_units[match.group(2)]
+
+
+# apply_transform takes extant svg_xml and returns a QTransform(): its transform list, then its x/y offset
+def node_transform(xml_node):
+    transform = parse_transform(xml_node.get('transform'))
+    x = svg_length(xml_node.get('x'))
+    y = svg_length(xml_node.get('y'))
+    return QTransform.fromTranslate(x, y) * transform
+
+
+# the x/y of a placement folded into its transform, which a <g> has no other way to take. -> that QTransform
+def fold_offset(placement):
+    t = node_transform(placement)
+    placement.attrib.pop('x', None)
+    placement.attrib.pop('y', None)
+    placement.set('transform', 'matrix(%r %r %r %r %r %r)' % (t.m11(), t.m12(), t.m21(), t.m22(), t.dx(), t.dy()))
+    return t
+
+
+# waypoint row for a placement <g>. the placement carries the whole use transform: the anchor draws the
+# symbol where the waypoint item sits, while the item itself renders the bare symbol by id
+def place_waypoint(placement):
+    t = fold_offset(placement)
+    return placement[0].get('id'), (t.m11(), t.m12(), t.m13(),
+                                    t.m21(), t.m22(), t.m23(),
+                                    t.m31(), t.m32(), t.m33())
+
+
+# lxml stage of SvgLand.load, usable without a view:
+# flattened svg bytes + waypoint transform table [(element_id, (m11, ..., m33)), ...]
+def preprocess_svg(source_bytes):
+    root = etree.fromstring(source_bytes)
+
+    symbols_layer = etree.SubElement(root, '{0}g'.format(SVG_NS))
+    symbols_layer.set('id', 'symbols_layer')
+    resolve_uses(root, symbols_layer)
+
+    waypoints = [place_waypoint(placement) for placement in symbols_layer]
+    return etree.tostring(root.getroottree()), waypoints
+
+
+# containers that are written open-ended while streaming; everything else is buffered up to its end tag
+stream_containers = (SVG_NS + 'svg', SVG_NS + 'g')
+
+
+# preprocess_svg in one iterparse pass for documents too large to hold as a tree. svg/g containers are
+# opened on the output as they start, every other element is written whole at its end tag and then
+# dropped, so only symbols, the attributes of each use and the output itself stay in memory.
+# same result as preprocess_svg, except that unused symbols and uses whose target never turns out to be
+# a symbol move to the end of the document, and container text/tails (whitespace in practice) are dropped.
+# source: bytes, a path or a binary file object
+def stream_preprocess_svg(source):
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+
+    out = BytesIO()
+    ids = set()
+    symbols = {}
+    uses = []
+    open_tags = []
+    waypoints = []
+    # symbols open around the current element: uses inside them stay, expand_nested_uses takes care of those
+    in_symbol = 0
+    with etree.xmlfile(out) as xf:
+        for action, node in etree.iterparse(source, events=('start', 'end'), huge_tree=True):
+            if action == 'start':
+                node_id = node.get('id')
+                if node_id is not None:
+                    ids.add(node_id)
+                if node.tag == SVG_NS + 'symbol':
+                    in_symbol += 1
+                # None marks a buffered element, and everything below it is buffered too
+                if (not open_tags or open_tags[-1] is not None) and node.tag in stream_containers:
+                    tag = xf.element(node.tag, dict(node.attrib), nsmap=None if open_tags else node.nsmap)
+                    tag.__enter__()
+                    open_tags.append(tag)
+                else:
+                    open_tags.append(None)
+                continue
+
+            tag = open_tags.pop()
+            parent = node.getparent()
+            if node.tag == SVG_NS + 'use':
+                uid = use_target(node)
+                # forward references are taken as symbols until the end of the document proves otherwise
+                if uid is not None and not in_symbol and (uid in symbols or uid not in ids):
+                    parent.remove(node)
+                    uses.append((uid, dict(node.attrib)))
+                    continue
+            elif node.tag == SVG_NS + 'symbol':
+                in_symbol -= 1
+                node_id = node.get('id')
+                if node_id is not None and node_id not in symbols:
+                    if parent is not None:
+                        parent.remove(node)
+                    symbols[node_id] = node
+                    continue
+
+            if tag is None and (not open_tags or open_tags[-1] is not None):
+                xf.write(node, with_tail=False)
+            if not open_tags:
+                waypoints = stream_symbols_layer(xf, symbols, uses, ids)
+            if tag is not None:
+                tag.__exit__(None, None, None)
+            if tag is not None or not open_tags or open_tags[-1] is not None:
+                node.clear()
+                if parent is not None:
+                    parent.remove(node)
+
+    svg_bytes = out.getvalue()
+    out.close()
+    return svg_bytes, waypoints
+
+
+# tail of stream_preprocess_svg: symbols_layer with every expanded use, then the leftovers
+def stream_symbols_layer(xf, symbols, uses, ids):
+    waypoints = []
+    expanded = {}
+    unresolved = []
+    expand_nested_uses(symbols)
+    with xf.element(SVG_NS + 'g', {'id': 'symbols_layer'}):
+        for uid, use in uses:
+            symbol = symbols.get(uid)
+            if symbol is None:
+                unresolved.append(use)
+                continue
+            fax_id = next_fax_id(uid, expanded, ids)
+            ids.add(fax_id)
+            placement = symbol_placement(use, fax_id, symbol, {None: SVG_NS[1:-1]})
+            waypoints.append(place_waypoint(placement))
+            xf.write(placement)
+    for uid, symbol in symbols.items():
+        if uid not in expanded:
+            xf.write(symbol, with_tail=False)
+    for attrib in unresolved:
+        xf.write(etree.Element(SVG_NS + 'use', attrib))
+    return waypoints
+
+
+# preprocess through the diagram cache when there is one: a warm cache skips the lxml stage entirely.
+# source is the document bytes, or with stream=True also a path, which is then never read whole.
+# -> (flattened svg bytes, waypoint table, served from cache)
+def flatten_svg(source, diagram_cache=None, stream=False):
+    preprocess = stream_preprocess_svg if stream else preprocess_svg
+    if diagram_cache is None:
+        return preprocess(source) + (False,)
+
+    if isinstance(source, bytes):
+        cache_key = diagram_cache.key(source)
+    else:
+        cache_key = diagram_cache.file_key(source)
+    cached = diagram_cache.get(cache_key)
+    if cached is not None:
+        return cached + (True,)
+
+    svg_filtered, waypoints = preprocess(source)
+    diagram_cache.put(cache_key, svg_filtered, waypoints)
+    return svg_filtered, waypoints, False
+
+
+# what a placement copies from the use it replaces: everything else about a use is not drawn
+def use_signature(uid, use):
+    return (uid,) + tuple(use.get(att) for att in use_placement_attributes)
+
+
+# an element and its subtree, serialized, for comparing versions of a document
+def subtree_bytes(node):
+    return etree.tostring(node, with_tail=False)
+
+
+# swaps the children of `old` that differ from those of `new` (taken from new's tree) and returns how many elements
+# went in or out. the unchanged runs at both ends stay; a single differing child with the same tag, attributes and
+# text on both sides is patched the same way, anything else in between is replaced whole. `skip` is left alone
+def patch_children(old, new, skip=None):
+    old_children = [child for child in old if child is not skip]
+    new_children = list(new)
+    n = min(len(old_children), len(new_children))
+    head = 0
+    while head < n and etree.tostring(old_children[head]) == etree.tostring(new_children[head]):
+        head += 1
+    tail = 0
+    while tail < n - head and etree.tostring(old_children[-1 - tail]) == etree.tostring(new_children[-1 - tail]):
+        tail += 1
+    old_mid = old_children[head:len(old_children) - tail]
+    new_mid = new_children[head:len(new_children) - tail]
+
+    if len(old_mid) == 1 and len(new_mid) == 1:
+        a, b = old_mid[0], new_mid[0]
+        if a.tag == b.tag and a.text == b.text and a.tail == b.tail and dict(a.attrib) == dict(b.attrib) and len(b):
+            return patch_children(a, b)
+
+    for child in old_mid:
+        old.remove(child)
+    for k, child in enumerate(new_mid):
+        old.insert(head + k, child)
+    return len(old_mid) + len(new_mid)
+
+
+# what LiveDiagram.update found. per waypoint row of the new version: the row of the previous version it carries
+# over from (source, None for new uses); measure lists the rows whose item geometry has to be taken anew.
+# svg_bytes is None when nothing drawn changed
+class DiagramEdit(object):
+    def __init__(self, svg_bytes, waypoints, source, measure, removed, replaced, page_changed):
+        self.svg_bytes = svg_bytes
+        self.waypoints = waypoints
+        self.source = source
+        self.measure = measure
+        self.removed = removed
+        self.replaced = replaced
+        self.page_changed = page_changed
+
+    def __len__(self):
+        return len(self.measure) + self.removed + self.replaced
+
+
+# a document kept as its flattened tree (what preprocess_svg builds) between versions, so a reload only redoes what
+# an edit touched. update() diffs a new version of the source against it: differing background subtrees are swapped
+# for the new ones, placements of unchanged uses stay, those of edited uses and of uses of edited symbols are
+# rebuilt. a waypoint keeps its id while its use stays in place; new uses take the next free copy id of their symbol
+class LiveDiagram(object):
+    def __init__(self, source_bytes):
+        self.source = source_bytes
+        root = etree.fromstring(source_bytes)
+        self.symbols_layer = etree.SubElement(root, '{0}g'.format(SVG_NS))
+        self.symbols_layer.set('id', 'symbols_layer')
+        found = symbol_uses(root)
+        # taken while the symbols are in the tree: a detached element serializes with made up namespace prefixes
+        self.symbols = self.symbol_texts(found[1])
+        uses = resolve_uses(root, self.symbols_layer, found)
+        self.root = root
+        self.uses = [use_signature(uid, use) for uid, use, symbol in uses]
+        self.waypoints = [place_waypoint(placement) for placement in self.symbols_layer]
+        self.svg_bytes = etree.tostring(root.getroottree())
+        # next copy number to try per symbol
+        self.copies = {}
+
+    @staticmethod
+    def symbol_texts(uses):
+        texts = {}
+        for uid, use, symbol in uses:
+            if uid not in texts:
+                texts[uid] = subtree_bytes(symbol)
+        return texts
+
+    # id for a new copy of symbol uid: the bare symbol id while no placement has it, as for a document's first use
+    def copy_id(self, uid, live, index):
+        if uid not in live:
+            return uid
+        n = self.copies.get(uid, 1)
+        fax_id = '%s-%d' % (uid, n)
+        while fax_id in live or fax_id in index:
+            n += 1
+            fax_id = '%s-%d' % (uid, n)
+        self.copies[uid] = n + 1
+        return fax_id
+
+    # -> DiagramEdit, None when the source did not change. the new version is taken over once it parsed:
+    # the next update diffs against it
+    def update(self, source_bytes):
+        if source_bytes == self.source:
+            return None
+        root = etree.fromstring(source_bytes)
+        index, uses = symbol_uses(root)
+        symbols = self.symbol_texts(uses)
+        edited = set(uid for uid, text in symbols.items() if self.symbols.get(uid) != text)
+
+        # the new background: the document without its expanded uses and their symbols, as in the kept tree
+        for uid, use, symbol in uses:
+            use.getparent().remove(use)
+        for uid in symbols:
+            symbol = index[uid]
+            symbol.getparent().remove(symbol)
+        page_changed = dict(root.attrib) != dict(self.root.attrib)
+        if page_changed:
+            self.root.attrib.clear()
+            self.root.attrib.update(root.attrib)
+        self.root.text = root.text
+        replaced = patch_children(self.root, root, self.symbols_layer)
+
+        # waypoint rows: unchanged runs at both ends carry over as they are, the rest is matched by use
+        signatures = [use_signature(uid, use) for uid, use, symbol in uses]
+        old = self.uses
+        n = min(len(old), len(signatures))
+        head = 0
+        while head < n and old[head] == signatures[head]:
+            head += 1
+        tail = 0
+        while tail < n - head and old[-1 - tail] == signatures[-1 - tail]:
+            tail += 1
+        matcher = SequenceMatcher(None, old[head:len(old) - tail], signatures[head:len(signatures) - tail],
+                                  autojunk=False)
+        opcodes = [('equal', 0, head, 0, head)] if head else []
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            opcodes.append((tag, head + i1, head + i2, head + j1, head + j2))
+        if tail:
+            opcodes.append(('equal', len(old) - tail, len(old), len(signatures) - tail, len(signatures)))
+
+        # uses edited in place keep their waypoint; what is left over of a changed run goes, or comes new
+        pairs = []
+        removed = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                pairs.extend(zip(range(i1, i2), range(j1, j2)))
+                continue
+            k = 0
+            while i1 + k < i2 and j1 + k < j2 and old[i1 + k][0] == signatures[j1 + k][0]:
+                pairs.append((i1 + k, j1 + k))
+                k += 1
+            removed.extend(range(i1 + k, i2))
+            pairs.extend((None, j) for j in range(j1 + k, j2))
+
+        placements = list(self.symbols_layer)
+        live = set(self.waypoints[i][0] for i in range(len(old))) - set(self.waypoints[i][0] for i in removed)
+        waypoints = []
+        layer = []
+        source = []
+        measure = []
+        for i, j in pairs:
+            uid, use, symbol = uses[j]
+            if i is not None and old[i] == signatures[j] and uid not in edited:
+                layer.append(placements[i])
+                waypoints.append(self.waypoints[i])
+            else:
+                fax_id = self.waypoints[i][0] if i is not None else self.copy_id(uid, live, index)
+                live.add(fax_id)
+                placement = symbol_placement(use, fax_id, symbol)
+                layer.append(placement)
+                waypoints.append(place_waypoint(placement))
+                measure.append(j)
+            source.append(i)
+        self.symbols_layer[:] = layer
+
+        self.source = source_bytes
+        self.uses = signatures
+        self.symbols = symbols
+        self.waypoints = waypoints
+        changed = replaced or page_changed or measure or removed
+        self.svg_bytes = etree.tostring(self.root.getroottree()) if changed else self.svg_bytes
+        return DiagramEdit(self.svg_bytes if changed else None, waypoints, source, measure, len(removed), replaced,
+                           page_changed)
+
+
+# elements whose content is drawn wherever a reference puts it, at a scale the tree above it does not tell
+drawn_by_reference = set(SVG_NS + tag for tag in ('defs', 'symbol', 'clipPath', 'mask', 'marker', 'pattern'))
+# markers sit on the vertices, simplifying would move them
+marker_attributes = ('marker', 'marker-start', 'marker-mid', 'marker-end')
+# lxml writes attributes after one space, in double quotes; a literal start keeps the scan a memchr
+path_data = compile(rb' d="([^"]*)"')
+
+
+# the uniform scale of the drawing root coordinates in document (item) units, from its viewBox
+def document_scale(root):
+    view_box = root.get('viewBox')
+    if not view_box:
+        return 1.0
+    try:
+        x, y, w, h = [float(v) for v in view_box.replace(',', ' ').split()]
+        return min(float(root.get('width', w)) / w, float(root.get('height', h)) / h)
+    except ValueError:
+        # unit suffixes, percentages: taken as drawn 1:1
+        return 1.0
+
+
+# the uniform scale `node` is drawn at in document units, None inside content drawn by reference.
+# scales memoizes the ancestors, and starts out with the root's document_scale
+def drawn_scale(node, scales):
+    chain = []
+    scale = 1.0
+    while node is not None:
+        if node in scales:
+            scale = scales[node]
+            break
+        chain.append(node)
+        node = node.getparent()
+    for node in reversed(chain):
+        if scale is not None:
+            if node.tag in drawn_by_reference:
+                scale = None
+            else:
+                transform = node.get('transform')
+                if transform:
+                    m11, m12, m21, m22, dx, dy = transform_matrix(transform)
+                    scale *= abs(m11 * m22 - m12 * m21) ** 0.5
+        scales[node] = scale
+    return scale
+
+
+# a flattened document drawn with simplified paths. its renderer stands in for the full one while the vertices
+# it drops would move less than SvgLand.detail_pixels on screen: tolerance (document units) * scale_s
+class DetailLevel(object):
+    def __init__(self, tolerance, renderer, byte_count, vertices):
+        self.tolerance = tolerance
+        self.renderer = renderer
+        self.byte_count = byte_count
+        self.vertices = vertices
+
+
+# document units, one candidate level per halving of the zoom
+detail_tolerances = (1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+
+
+# simplified variants of a flattened document, finest first. only documents with min_vertices of straight path
+# segments get any, and only tolerances that still matter at a size the page can be zoomed out to (the whole
+# height on 512 pixels). a level is built when it drops a quarter of the vertices the finer one draws; each costs
+# a renderer. paths with curves or markers, short ones and those drawn by reference stay as they are.
+# None once `cancelled` returns True
+def detail_levels(svg_bytes, height, tolerances=detail_tolerances, min_vertices=20000, min_path=16,
+                  cancelled=None):
+    # a vertex takes four bytes of path data at least: not worth a parse below that
+    if sum(m.end(1) - m.start(1) for m in path_data.finditer(svg_bytes)) < min_vertices * 4:
+        return []
+    tolerances = [t for t in tolerances if t <= height / 1024.0]
+    if not tolerances:
+        return []
+    root = etree.fromstring(svg_bytes)
+    scales = {root: document_scale(root)}
+    paths = SimplifiedPaths()
+    for node in root.iter(SVG_NS + 'path'):
+        d = node.get('d')
+        if not d or 'marker' in node.get('style', '') or any(node.get(att) for att in marker_attributes):
+            continue
+        scale = drawn_scale(node, scales)
+        if not scale:
+            continue
+        subpaths = parse_polylines(d)
+        if subpaths is None or sum(len(points) for points, closed in subpaths) < min_path:
+            continue
+        paths.add(node, subpaths, scale)
+    drawn = paths.vertices
+    if drawn < min_vertices:
+        return []
+
+    paths.simplify(tolerances[0])
+    levels = []
+    for tolerance in tolerances:
+        kept = paths.kept(tolerance)
+        if kept > drawn * 0.75:
+            continue
+        if cancelled is not None and cancelled():
+            return None
+        for node, d in paths.data(tolerance):
+            node.set('d', d)
+        level_bytes = etree.tostring(root.getroottree())
+        renderer = QSvgRenderer()
+        renderer.load(QByteArray(level_bytes))
+        levels.append(DetailLevel(tolerance, renderer, len(level_bytes), kept))
+        drawn = kept
+    return levels
+
+
+# what the worker half of a load hands to the view: flattened document, a renderer built for it and
+# each waypoint's element id with its item transform. key is the svgPool.document_key it was prepared from
+# a document ready to attach. waypoint placements live in the bounds table only, as rows of plain floats.
+# live is the LiveDiagram it was flattened through, for views that reload the document as it changes;
+# levels its detail_levels for drawing it zoomed out
+class PreparedDiagram(object):
+    def __init__(self, path, svg_bytes, renderer, bounds, cached=False, stream=False, key=None, live=None,
+                 levels=()):
+        self.path = path
+        self.key = key
+        self.bounds = bounds
+        self.svg_bytes = svg_bytes
+        self.renderer = renderer
+        self.cached = cached
+        self.stream = stream
+        self.live = live
+        self.levels = levels
+
+    # every renderer of the document goes once the event loop is back
+    def release(self):
+        self.renderer.deleteLater()
+        for level in self.levels:
+            level.renderer.deleteLater()
+
+
+# item size and transform (m11, m12, m21, m22, dx, dy) of a waypoint placed by `matrix`:
+# item geometry starts at the symbol's bounds, not at its origin
+def waypoint_geometry(renderer, symbol_id, matrix):
+    bounds = renderer.boundsOnElement(symbol_id)
+    t = QTransform.fromTranslate(bounds.x(), bounds.y()) * QTransform(*matrix)
+    return (bounds.width(), bounds.height()), (t.m11(), t.m12(), t.m21(), t.m22(), t.dx(), t.dy())
+
+
+# everything SvgLand.load does before it needs the scene: preprocessing, renderer build, waypoint geometry.
+# safe off the gui thread. `cancelled` is polled before the renderer is built; None once it returns True.
+# live flattens through a LiveDiagram that comes along (documents below stream_threshold), instead of the cache.
+# detail builds the detail_levels too, a LoadJob leaves them for after the document is shown
+def prepare_diagram(path, diagram_cache=None, stream_threshold=32 * 1024 * 1024, cancelled=None, live=False,
+                    detail=True):
+    key = document_key(path)
+    # large documents are streamed from disk instead of being parsed into one tree
+    stream = getsize(path) >= stream_threshold
+    if stream:
+        source = path
+    else:
+        with open(path, 'rb') as f:
+            source = f.read()
+
+    if live and not stream:
+        live = LiveDiagram(source)
+        svg_filtered, waypoints, cached = live.svg_bytes, live.waypoints, False
+    else:
+        live = None
+        svg_filtered, waypoints, cached = flatten_svg(source, diagram_cache, stream)
+    event(DEBUG, 'load.preprocessed', path=path, waypoints=len(waypoints), cached=cached, stream=stream)
+    if cancelled is not None and cancelled():
+        return None
+
+    renderer = QSvgRenderer()
+    renderer.load(QByteArray(svg_filtered))
+    event(DEBUG, 'load.renderer', size='%dx%d' % (renderer.defaultSize().width(), renderer.defaultSize().height()))
+
+    ids = []
+    sizes = []
+    matrices = []
+    for symbol_id, matrix in waypoints:
+        size, t = waypoint_geometry(renderer, symbol_id, matrix)
+        ids.append(symbol_id)
+        sizes.append(size)
+        matrices.append(t)
+    bounds = BoundsTable(ids, sizes, matrices)
+
+    # streamed documents are too large to hold a second tree of
+    levels = []
+    if detail and not stream:
+        levels = detail_levels(svg_filtered, renderer.defaultSize().height(), cancelled=cancelled)
+        if levels is None:
+            return None
+        event(DEBUG, 'load.levels', tolerances=[level.tolerance for level in levels],
+              vertices=[level.vertices for level in levels])
+    return PreparedDiagram(path, svg_filtered, renderer, bounds, cached, stream, key, live, levels)
+
+
+class LoadJob(QRunnable):
+    def __init__(self, loader, path, diagram_cache, stream_threshold, live=False):
+        super(LoadJob, self).__init__()
+        self.loader = loader
+        self.generation = loader.generation
+        self.path = path
+        self.diagram_cache = diagram_cache
+        self.stream_threshold = stream_threshold
+        self.live = live
+
+    def cancelled(self):
+        return self.generation != self.loader.generation
+
+    def run(self):
+        try:
+            prepared = prepare_diagram(self.path, self.diagram_cache, self.stream_threshold, self.cancelled, self.live,
+                                       detail=False)
+        except Exception as e:
+            # nothing may escape a pool thread's run(): the view reports it and keeps what it shows
+            self.loader.failed.emit(self.generation, '%s: %s' % (self.path, e))
+            return
+        if prepared is None:
+            return
+        height = prepared.renderer.defaultSize().height()
+        svg_bytes = prepared.svg_bytes
+        # owned by the gui thread, so the python wrapper never dies on a pool thread
+        gui_thread = QCoreApplication.instance().thread()
+        prepared.renderer.moveToThread(gui_thread)
+        self.loader.loaded.emit(self.generation, prepared)
+
+        # the document shows meanwhile, simplified levels for zooming out follow
+        if prepared.stream:
+            return
+        try:
+            levels = detail_levels(svg_bytes, height, cancelled=self.cancelled)
+        except Exception as e:
+            # the document shows as it is, only without simplified levels
+            log.warning('detail levels failed: %s: %s', self.path, e)
+            return
+        if levels:
+            event(DEBUG, 'load.levels', tolerances=[level.tolerance for level in levels],
+                  vertices=[level.vertices for level in levels])
+            for level in levels:
+                level.renderer.moveToThread(gui_thread)
+            self.loader.detailed.emit(prepared, svg_bytes, levels)
+
+
+# runs prepare_diagram on a background pool. every start() supersedes the previous load: running jobs bail
+# out at their next cancellation check, and results that still arrive carry a stale generation
+class DiagramLoader(QObject):
+    loaded = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    # a loaded document's detail levels, with the flattened bytes they were built from
+    detailed = pyqtSignal(object, object, object)
+
     def __init__(self, parent=None):
+        super(DiagramLoader, self).__init__(parent)
+        self.generation = 0
+        self.pool = QThreadPool(self)
+        # a superseded job may still be inside lxml, the next one should not queue behind it
+        self.pool.setMaxThreadCount(2)
+
+    def start(self, path, diagram_cache=None, stream_threshold=32 * 1024 * 1024, live=False):
+        self.cancel()
+        self.pool.start(LoadJob(self, path, diagram_cache, stream_threshold, live))
+        return self.generation
+
+    def cancel(self):
+        self.generation += 1
+        self.pool.clear()
+
+    def stop(self):
+        self.cancel()
+        self.pool.waitForDone()
+
+
+# custom non-qt animator class: per-item facade over one TweenEngine slot, the engine steps all of them at once
+class SvgLayerAnimator(QPointF):
+    def __init__(self, parent=None, engine=None):
         super(SvgLayerAnimator, self).__init__()
         self.item = parent
-        self.p1 = QPointF()
-        self.p2 = QPointF()
-        self.rate = 120.0
-        self.is_animating = False
-        self.tct = 0
+        self.engine = engine if engine is not None else TweenEngine()
+        self.slot = self.engine.allocate(parent)
+        finalize(self, self.engine.release, self.slot)
         self.scale_shift = 1
 
+    @property
+    def p1(self):
+        p = self.engine.p1[self.slot]
+        return QPointF(p[0], p[1])
+
+    @p1.setter
+    def p1(self, point):
+        self.engine.p1[self.slot] = (point.x(), point.y())
+
+    @property
+    def p2(self):
+        p = self.engine.p2[self.slot]
+        return QPointF(p[0], p[1])
+
+    @p2.setter
+    def p2(self, point):
+        self.engine.p2[self.slot] = (point.x(), point.y())
+
+    @property
+    def tct(self):
+        return float(self.engine.tct[self.slot])
+
+    @tct.setter
+    def tct(self, value):
+        self.engine.tct[self.slot] = value
+
+    @property
+    def rate(self):
+        return float(self.engine.rate[self.slot])
+
+    @rate.setter
+    def rate(self, value):
+        self.engine.rate[self.slot] = value
+
+    @property
+    def is_animating(self):
+        return bool(self.engine.animating[self.slot])
+
+    @property
+    def reference_fps(self):
+        return self.engine.reference_fps
+
+    def x(self):
+        return float(self.engine.pos[self.slot, 0])
+
+    def y(self):
+        return float(self.engine.pos[self.slot, 1])
+
+    def setX(self, x):
+        self.engine.pos[self.slot, 0] = x
+
+    def setY(self, y):
+        self.engine.pos[self.slot, 1] = y
+
     def reset_position(self, reset_pos: QPointF):
         self.p1 = reset_pos
         self.p2 = reset_pos
         self.setX(reset_pos.x())
         self.setY(reset_pos.y())
+        self.engine.capture(self.slot, self.item)
 
     def reset_easing(self):
         self.tct = 0
 
-    def idle(self):
-        a = float((self.p1.x() - self.p2.x()))
-        b = float((self.p1.y() - self.p2.y()))
-        d = sqrt(pow(a, 2) + pow(b, 2))
-
-        arp = ease_in_out_sine(self.tct, 0, 1, self.rate)
-        self.is_animating = d > 0.0005
-
-        if self.is_animating:
-
-            if not self.item.is_anchor:
-                aps = sin(pi * ((self.tct*2) / self.rate))
-                print(self.tct, self.rate, aps)
-                self.item.setScale(1+aps)
-
-            x = float(self.x()) - float(a * arp)  #pure luck here.
-            y = float(self.y()) - float(b * arp)
-            self.setX(x)
-            self.setY(y)
-            self.p1 = QPointF(x, y)
+    # dt is the wall time since the previous frame; easing progress is kept on a reference_fps
+    # timeline so the animation takes as long on a 30 fps machine as on a 144 fps one
+    def idle(self, dt=None):
+        self.engine.step(dt, self.slot)
+
+
+# frame clock for a TweenEngine: ticks at the screen refresh rate (capped at max_fps) only while some
+# tween is moving or coalesced input is pending, steps the engine (and the view's KineticMotion) by the
+# elapsed wall time, and stops itself once everything settles. wake() restarts it; input handlers and
+# svg_move_to_index call it.
+class AnimationClock(QObject):
+    frame = pyqtSignal(float)
+
+    def __init__(self, parent=None, engine=None, max_fps=60.0):
+        super(AnimationClock, self).__init__(parent)
+        self.engine = engine if engine is not None else TweenEngine()
+        self.max_step = 0.1
+        # FrameProfiler charged with the engine step of every tick, when set
+        self.profiler = None
+        # KineticMotion stepped before the engine every tick, when set
+        self.motion = None
+        self.elapsed = QElapsedTimer()
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+        self.set_fps(max_fps)
+
+    def set_fps(self, max_fps):
+        fps = max_fps
+        screen = QGuiApplication.primaryScreen()
+        if screen is not None and screen.refreshRate() > 1.0:
+            fps = min(fps, screen.refreshRate())
+        self.fps = fps
+        self.timer.setInterval(max(1, int(round(1000.0 / fps))))
 
-            self.item.update_pos()
-            self.tct += 0.5
+    @property
+    def running(self):
+        return self.timer.isActive()
+
+    def wake(self):
+        if not self.timer.isActive():
+            self.elapsed.start()
+            self.timer.start()
+
+    def tick(self):
+        # a stalled frame must not teleport animations to their end
+        dt = min(self.elapsed.restart() / 1000.0, self.max_step)
+        if self.profiler is not None:
+            t = perf_counter()
+            animating = self.step(dt)
+            self.profiler.add_idle(perf_counter() - t)
         else:
-            self.tct = 0
+            animating = self.step(dt)
+        if gate.trace:
+            event(TRACE, 'clock.tick', dt='%.4f' % dt, animating=animating)
+        self.frame.emit(dt)
+        if not animating:
+            self.timer.stop()
+
+    def step(self, dt):
+        moving = self.motion is not None and self.motion.step(dt)
+        return self.engine.step(dt) or moving
 
 
 # broadly defined SVG container (recipient of id-based query towards imported svg)
@@ -119,25 +1090,75 @@ class SvgLayer(QGraphicsSvgItem):
         self.height = None
         self.usage_type = None
         self.transform = QTransform()
-        self.animator = SvgLayerAnimator(self)
+        self.animator = SvgLayerAnimator(self, getattr(parent, 'tweens', None))
         self.origin = None
         self.is_anchor = False
+        self.cache_role = 'waypoint'
+        # row in the view's BoundsTable, None for the anchor and items created outside a load.
+        # at_placement drops once the item is scaled or moved off its placement (load_item, tweens)
+        self.bounds_row = None
+        self.at_placement = True
+        # the WaypointRecord this item currently draws, when it came from the view's item pool
+        self.record = None
 
     @property
     def test_prop(self):
         return ['alright, then.', self.usage_type]
 
-    def get_center_pos(self):
+    # unscaled element size; from the document's bounds table rather than a renderer query where possible
+    def local_size(self):
+        if self.width is not None:
+            return self.width, self.height
+        if self.bounds_row is not None:
+            return self.parent.bounds_table.size_of(self.bounds_row)
         d = self.boundingRect()
+        return d.width(), d.height()
+
+    # an item still at its placement: the bounds table describes it exactly
+    def at_rest(self):
+        return self.at_placement and self.bounds_row is not None
+
+    # (left, top, right, bottom) in anchor coordinates
+    def parent_extent(self):
+        if self.at_rest():
+            return self.parent.bounds_table.rect_of(self.bounds_row)
+        w, h = self.local_size()
+        r = self.mapRectToParent(QRectF(0, 0, w, h))
+        return r.left(), r.top(), r.right(), r.bottom()
+
+    # whether the anchor point (x, y) is on the element itself, not just within its extent
+    def parent_contains(self, x, y):
+        if self.at_rest():
+            return self.parent.bounds_table.contains(self.bounds_row, x, y)
+        w, h = self.local_size()
+        p = self.mapFromParent(QPointF(x, y))
+        return 0.0 <= p.x() < w and 0.0 <= p.y() < h
+
+    # (left, top, right, bottom) in scene coordinates
+    def scene_extent(self):
+        if self.at_rest():
+            return self.parent.bounds_table.scene_rect_of(self.bounds_row, self.parentItem())
+        w, h = self.local_size()
+        r = self.mapRectToScene(QRectF(0, 0, w, h))
+        return r.left(), r.top(), r.right(), r.bottom()
+
+    def get_center_pos(self):
+        if self.bounds_row is not None:
+            return QPointF(*self.parent.bounds_table.center_of(self.bounds_row))
+        w, h = self.local_size()
         m = self.transform.map(0, 0)
-        c = QPointF(d.width() / 2, d.height() / 2)
-        g = QPointF(m[0], m[1])
-        return c + g
+        return QPointF(w / 2 + m[0], h / 2 + m[1])
 
     def get_center_pos_scene(self):
-        sd = self.sceneBoundingRect()
-        sp = self.scenePos() + (QPointF(sd.width() / 2, sd.height() / 2))
-        return sp
+        if self.at_rest():
+            table = self.parent.bounds_table
+            left, top, right, bottom = table.scene_rect_of(self.bounds_row, self.parentItem())
+            # scenePos() of an item at its placement: its origin through the anchor's scale and position
+            scale, x, y = table.scene_transform
+            ox, oy = table.origin_of(self.bounds_row)
+            return QPointF(x + ox * scale + (right - left) / 2, y + oy * scale + (bottom - top) / 2)
+        left, top, right, bottom = self.scene_extent()
+        return self.scenePos() + QPointF((right - left) / 2, (bottom - top) / 2)
 
     def update_pos(self):
         self.center_x = float(self.animator.p1.x() - self.origin.x())
@@ -145,11 +1166,12 @@ class SvgLayer(QGraphicsSvgItem):
         self.update_view()
 
     def load_item(self):
-        print('SvgLayer loaded positioning', self)
+        if gate.debug:
+            event(DEBUG, 'layer.load', id=self.elementId() or '<document>', anchor=self.is_anchor)
         m = self.transform.map(0, 0)
-        self.size = self.boundingRect()
-        self.width = self.size.width()
-        self.height = self.size.height()
+        self.width, self.height = self.local_size()
+        self.size = QRectF(0, 0, self.width, self.height)
+        self.at_placement = False
         self.origin = QPointF(m[0], m[1])
         self.animator.reset_position(self.origin)
         self.scale_s = 0.5
@@ -166,55 +1188,317 @@ class SvgLayer(QGraphicsSvgItem):
         self.update_view()
 
     def zoom(self, evt):
-        mouse_angle = evt.angleDelta().y()
-        z = self.mapFromScene(evt.pos())
+        self.zoom_by(1.0025 ** (-evt.angleDelta().y()), evt.pos())
+
+    # scale by factor about the view point pos, never below the page fitting the viewport height.
+    # False when that limit left nothing to do
+    def zoom_by(self, factor, pos):
+        z = self.mapFromScene(pos)
         dx = z.x() - self.width / 2
         dy = z.y() - self.height / 2
         c_x = self.center_x + dx * self.scale_s
         c_y = self.center_y + dy * self.scale_s
-        self.scale_s = self.scale_s * 1.0025 ** (-mouse_angle)
+        old = self.scale_s
+        self.scale_s = self.scale_s * factor
         s = self.parent.dims_viewport_raw.height() / self.height
         if self.scale_s < s:
             self.scale_s = s
+        if self.scale_s == old:
+            return False
 
         self.setScale(self.scale_s)
+        self.parent.cache_policy.zoomed(self.parent, self.scale_s)
+        self.parent.cache_settle_timer.start()
 
         self.center_x = c_x - dx * self.scale_s
         self.center_y = c_y - dy * self.scale_s
         self.animator.setX(self.center_x)
         self.animator.setY(self.center_y)
         self.update_view()
+        return True
+
+    # the tween position follows a center moved by hand (drags, momentum)
+    def sync_animator(self):
+        self.animator.setX(self.center_x)
+        self.animator.setY(self.center_y)
 
-    # generally responsible endpoint for all transforming
+    # generally responsible endpoint for all transforming (runs every animated frame: plain floats, no Qt temporaries)
     def update_view(self):
-        w = self.scale() * self.width
-        h = self.scale() * self.height
-        c = QPointF(self.center_x - w / 2.0, self.center_y - h / 2.0)
+        scale = self.scale()
+        w = scale * self.width
+        h = scale * self.height
+        x = self.center_x - w / 2.0
+        y = self.center_y - h / 2.0
 
-        #// can optimize?
         if self.is_anchor:
-            chk = QRectF(self.parent.dims_viewport_raw)
-
-            if c.y() > 0:
-                c.setY(0.0)
+            if self.parent.bounds_table is not None:
+                self.parent.bounds_table.invalidate()
+            viewport = self.parent.dims_viewport_raw
+            vw = viewport.width()
+            vh = viewport.height()
+
+            if y > 0:
+                y = 0.0
                 self.center_y = h / 2
 
-            if c.y()+h < chk.height():
-                c.setY(chk.height()-h)
-                self.center_y = chk.height() - h / 2
+            if y + h < vh:
+                y = vh - h
+                self.center_y = vh - h / 2
 
-            if c.x() > 0:
-                c.setX(0.0)
+            if x > 0:
+                x = 0.0
                 self.center_x = w / 2
 
-            if c.x()+w < chk.width():
-                c.setX(chk.width()-w)
-                self.center_x = chk.width() - w / 2
+            if x + w < vw:
+                x = vw - w
+                self.center_x = vw - w / 2
+
+            # the scene viewport in document coordinates
+            if scale > 0.0:
+                r = self.parent.dims_viewport
+                self.parent.culler.update((r.left() - x) / scale, (r.top() - y) / scale,
+                                          (r.right() - x) / scale, (r.bottom() - y) / scale)
+
+        self.setPos(x, y)
+
+
+# a waypoint of the shown document: its row in the view's BoundsTable, plus the SvgLayer drawing it while it is
+# materialized (on screen, or pinned like the plush). stands in for the item wherever only identity and geometry
+# matter: the spatial index, hit tests and navigation
+class WaypointRecord(object):
+    __slots__ = ('table', 'row', 'usage_type', 'item', 'pinned')
+
+    def __init__(self, table, row, usage_type='waypoint'):
+        self.table = table
+        self.row = row
+        self.usage_type = usage_type
+        self.item = None
+        self.pinned = False
+
+    def elementId(self):
+        return self.table.ids[self.row]
 
-        self.setPos(c)
+    # records never hide. all share one z, the index breaks ties by document order like the pooled items' z does
+    def isVisible(self):
+        return True
+
+    def zValue(self):
+        return 1.0
+
+    def parent_extent(self):
+        item = self.item
+        if item is not None and not item.at_rest():
+            return item.parent_extent()
+        return self.table.rect_of(self.row)
+
+    def parent_contains(self, x, y):
+        item = self.item
+        if item is not None and not item.at_rest():
+            return item.parent_contains(x, y)
+        return self.table.contains(self.row, x, y)
+
+    def get_center_pos(self):
+        return QPointF(*self.table.center_of(self.row))
+
+
+# recycled SvgLayer items for materialized waypoint records. a released item stays hidden under the anchor until
+# an acquire re-targets it at another element, so the number of items tracks what is on screen, not the document
+class WaypointItemPool(object):
+    def __init__(self, view):
+        self.view = view
+        self.free = []
+        self.live = 0
+        self.created = 0
+
+    def acquire(self, record):
+        view = self.view
+        row = record.row
+        table = view.bounds_table
+        element_id = table.ids[row]
+        if self.free:
+            item = self.free.pop()
+            item.setElementId(element_id)
+            if item.scale() != 1.0:
+                item.setScale(1.0)
+                item.setPos(0.0, 0.0)
+        else:
+            item = view.make_svg_item(element_id)
+            item.setParentItem(view.anchor_layer)
+            self.created += 1
+        item.bounds_row = row
+        item.width, item.height = table.size_of(row)
+        # recycled items are stacked in acquire order, overlapping waypoints must still stack in document order
+        item.setZValue(1.0 + row / float(len(table) + 1))
+        item.at_placement = True
+        item.transform = QTransform(*table.matrix_of(row))
+        item.setTransform(item.transform)
+        item.usage_type = record.usage_type
+        item.cache_role = 'waypoint'
+        item.record = record
+        record.item = item
+        view.cache_policy.apply(item, view.anchor_layer.scale())
+        item.setVisible(True)
+        self.live += 1
+        return item
+
+    def release(self, record):
+        item = record.item
+        record.item = None
+        item.record = None
+        item.setVisible(False)
+        self.free.append(item)
+        self.live -= 1
+
+    # the items go with the anchor layer they are parented to
+    def clear(self):
+        self.free = []
+        self.live = 0
+
+    def report(self):
+        return 'items %d live %d pooled' % (self.live, len(self.free))
+
+
+# the document layer: with a tile pyramid attached it blits pre-rasterized tiles over the visible part of
+# the document and strokes vectors only past the deepest tile level, or where no tile is ready yet.
+# vectors come from the view's detail level for the current scale_s, when one is simple enough to stand in
+class SvgAnchorLayer(SvgLayer):
+    def paint(self, painter, option, widget=None):
+        tiles = self.parent.tiles
+        if tiles is None:
+            return self.paint_vectors(painter, option, widget)
+
+        missing = tiles.paint(painter, self.mapRectFromScene(self.parent.dims_viewport))
+        if missing is None:
+            return self.paint_vectors(painter, option, widget)
+
+        if missing:
+            clip = QPainterPath()
+            for rect in missing:
+                clip.addRect(rect)
+            painter.save()
+            painter.setClipPath(clip, Qt.IntersectClip)
+            self.paint_vectors(painter, option, widget)
+            painter.restore()
+
+    def paint_vectors(self, painter, option, widget):
+        renderer = self.parent.detail_renderer(self.scale_s)
+        if renderer is None:
+            return super(SvgAnchorLayer, self).paint(painter, option, widget)
+        # what QGraphicsSvgItem.paint does for an item without element id
+        renderer.render(painter, self.boundingRect())
+
+
+# pixmap caching for SvgLayer items, per cache_role. static items keep a device-resolution cache;
+# while zooming they switch to an item-resolution cache sized for the current scale band, which is
+# rebuilt only when the zoom crosses one of the thresholds. budget_kb is this view's share of pixmap memory:
+# the process-wide QPixmapCache limit is left alone, a view whose caches would outgrow its budget stops caching
+# its waypoints instead and draws them from the renderer.
+class RenderCachePolicy(object):
+    def __init__(self, budget_kb=64 * 1024):
+        self.static_modes = {
+            'anchor': QGraphicsItem.DeviceCoordinateCache,
+            'waypoint': QGraphicsItem.DeviceCoordinateCache,
+            'animated': QGraphicsItem.ItemCoordinateCache,
+        }
+        self.zoom_modes = {
+            'anchor': QGraphicsItem.NoCache,
+            'waypoint': QGraphicsItem.ItemCoordinateCache,
+            'animated': QGraphicsItem.ItemCoordinateCache,
+        }
+        self.thresholds = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+        self.max_cache_side = 2048
+        self.budget_kb = budget_kb
+        self.zooming = False
+        self.band = None
+        self.over_budget = False
+
+    def band_scale(self, scale):
+        band = bisect_left(self.thresholds, scale)
+        return band, self.thresholds[min(band, len(self.thresholds) - 1)]
+
+    def apply(self, item, scale=1.0):
+        modes = self.zoom_modes if self.zooming else self.static_modes
+        mode = modes.get(item.cache_role, QGraphicsItem.NoCache)
+        if self.over_budget and item.cache_role != 'anchor':
+            mode = QGraphicsItem.NoCache
+        if mode == QGraphicsItem.ItemCoordinateCache:
+            w, h = item.local_size()
+            band_scale = self.band_scale(scale)[1]
+            w = min(self.max_cache_side, max(1, int(ceil(w * band_scale))))
+            h = min(self.max_cache_side, max(1, int(ceil(h * band_scale))))
+            item.setCacheMode(mode, QSize(w, h))
+        else:
+            item.setCacheMode(mode)
+
+    def apply_all(self, view):
+        anchor = view.anchor_layer
+        scale = anchor.scale()
+        self.over_budget = False
+        self.apply(anchor, scale)
+        for item in anchor.childItems():
+            if isinstance(item, SvgLayer):
+                self.apply(item, scale * item.scale())
+        if self.estimate_bytes(view) > self.budget_kb * 1024:
+            self.over_budget = True
+            for item in anchor.childItems():
+                if isinstance(item, SvgLayer):
+                    self.apply(item)
+
+    # called from SvgLayer.zoom: item caches are invalidated only on entering a zoom or changing band
+    def zoomed(self, view, scale):
+        band = self.band_scale(scale)[0]
+        if not self.zooming or band != self.band:
+            self.zooming = True
+            self.band = band
+            self.apply_all(view)
+
+    def settle(self, view):
+        if self.zooming:
+            self.zooming = False
+            self.apply_all(view)
+
+    # rough pixmap footprint of the current cache modes, in bytes (32 bit pixels)
+    def estimate_bytes(self, view):
+        total = 0
+        viewport = QRectF(view.viewport().rect())
+        anchor = view.anchor_layer
+        vl, vt, vr, vb = viewport.left(), viewport.top(), viewport.right(), viewport.bottom()
+        band_scale = self.band_scale(anchor.scale())[1]
+        table = view.bounds_table
+        scene_rows = table.scene_rows(anchor) if table is not None else None
+        for item in [anchor] + anchor.childItems():
+            # pooled items are hidden and paint nothing
+            if not isinstance(item, SvgLayer) or not item.isVisible():
+                continue
+            mode = item.cacheMode()
+            if mode == QGraphicsItem.DeviceCoordinateCache:
+                if item.at_placement and item.bounds_row is not None:
+                    left, top, right, bottom = scene_rows[item.bounds_row]
+                else:
+                    left, top, right, bottom = item.scene_extent()
+                w = min(right, vr) - max(left, vl)
+                h = min(bottom, vb) - max(top, vt)
+                if w > 0 and h > 0:
+                    total += int(w) * int(h) * 4
+            elif mode == QGraphicsItem.ItemCoordinateCache:
+                w, h = item.local_size()
+                total += int(min(self.max_cache_side, w * band_scale)) * \
+                    int(min(self.max_cache_side, h * band_scale)) * 4
+        return total
+
+    def report(self, view):
+        return 'cache ~%.1f/%.0f MB%s' % (self.estimate_bytes(view) / 1048576.0, self.budget_kb / 1024.0,
+                                          ' over budget' if self.over_budget else '')
 
 
 class SvgLand(QGraphicsView):
+    # waypoints attached so far, waypoints in the document
+    load_progress = pyqtSignal(int, int)
+    load_finished = pyqtSignal(str)
+    load_failed = pyqtSignal(str)
+    # the shown document was edited in place (watch)
+    reloaded = pyqtSignal(str)
+
     def __init__(self, parent=None):
         super(SvgLand, self).__init__(parent)
         self.renderer = None
@@ -230,17 +1514,83 @@ class SvgLand(QGraphicsView):
         self.dims_center = None
         self.parent = parent
         self.click_start = None
-        self.start_center_x = 0.0
-        self.start_center_y = 0.0
         self.frame = 0
-        self.fps_average = (0.0,)
         self.paint_time = 0.0
         self.paint_time_delta = 1
+        self.paint_cost = 0.0
         self.new_loc = None
         self.plush = None
         self.index = 0
         self.string_paint_fps = None
         self.string_rel_mouse = None
+        self.debug_write_filtered = False
+        self.diagram_cache = None
+        # shared with other views to keep recently shown documents' renderers alive
+        self.renderer_pool = None
+        self.document_key = None
+        # documents at least this large (bytes) go through stream_preprocess_svg
+        self.stream_threshold = 32 * 1024 * 1024
+        self.cache_policy = RenderCachePolicy()
+        self.string_cache = None
+        self.use_tiles = False
+        # the pyramid while in tile mode (enter_tiles), None otherwise
+        self.tiles = None
+        # the anchor's static cache mode from before tile mode, put back by leave_tiles
+        self.anchor_cache_mode = None
+        # simplified variants of the document for the anchor to draw while zoomed out (detail_levels): a level
+        # stands in while its tolerance comes to at most detail_pixels on screen
+        self.detail_levels = ()
+        self.detail_pixels = 0.5
+        self.use_detail_levels = True
+        # one WaypointRecord per waypoint of the document; items only for those on screen (or pinned)
+        self.waypoints = []
+        self.item_pool = WaypointItemPool(self)
+        self.waypoint_index = WaypointIndex()
+        self.culler = ViewportCuller(self.waypoint_index, self.item_pool)
+        self.culler.changed = self.culled
+        self.bounds_table = None
+        self.tweens = TweenEngine()
+        self.tweens.moved = self.waypoints_moved
+        self.clock = AnimationClock(self, self.tweens)
+        # wheel and drag input is only recorded by the handlers and applied once per clock frame
+        self.motion = KineticMotion(self)
+        self.clock.motion = self.motion
+        self.item_count = 0
+
+        # frame timings; F2 toggles the on-screen overlay, F3 dumps the ring buffer to json and csv
+        self.profiler = FrameProfiler(target_fps=self.clock.fps)
+        self.clock.profiler = self.profiler
+        self.profile_dump_prefix = 'pyworkflow-frames'
+        self.overlay_timer = QTimer(self)
+        self.overlay_timer.setInterval(250)
+        self.overlay_timer.timeout.connect(lambda: self.viewport().update(self.profiler.overlay_rect))
+
+        # background loads: the anchor shows as soon as the document is ready, waypoints follow in batches of
+        # at most attach_budget seconds per event loop pass
+        self.loader = DiagramLoader(self)
+        self.loader.loaded.connect(self.attach_diagram)
+        self.loader.detailed.connect(self.attach_levels)
+        self.loader.failed.connect(self.load_error)
+        self.attach_budget = 0.008
+        self.attach_path = None
+        self.attach_queue = []
+        self.attach_next = 0
+        self.attach_timer = QTimer(self)
+        self.attach_timer.setInterval(0)
+        self.attach_timer.timeout.connect(self.attach_batch)
+
+        # hot reload (watch): the shown document's file is watched and edits of it are applied in place through
+        # the LiveDiagram it was flattened with. restore_view carries the view over a full reload
+        self.keep_live = False
+        self.live = None
+        self.watcher = None
+        self.restore_view = None
+
+        # back to crisp device caches once the wheel has been quiet for a moment
+        self.cache_settle_timer = QTimer(self)
+        self.cache_settle_timer.setSingleShot(True)
+        self.cache_settle_timer.setInterval(200)
+        self.cache_settle_timer.timeout.connect(lambda: self.cache_policy.settle(self))
 
         tile_pixmap = QPixmap(100, 100)
         tile_pixmap.fill(Qt.white)
@@ -256,7 +1606,14 @@ class SvgLand(QGraphicsView):
         self.setMouseTracking(True)
         self.setPalette(QPalette(Qt.white))
         self.setAutoFillBackground(True)
-        self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        # only the rects of moving items get repainted. a moving anchor dirties everything anyway, and past
+        # partial_update_limit animated items the region bookkeeping costs more than it saves
+        # (svgBenchmark.bench_animation), so then the view skips it and repaints in full
+        self.idle_update_mode = QGraphicsView.MinimalViewportUpdate
+        self.moving_update_mode = QGraphicsView.FullViewportUpdate
+        self.partial_update_limit = 200
+        self.setViewportUpdateMode(self.idle_update_mode)
+        self.setCacheMode(QGraphicsView.CacheBackground)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
 
@@ -266,63 +1623,16 @@ class SvgLand(QGraphicsView):
         h.setSharedRenderer(self.renderer)
         h.setElementId(item_id)
         h.setFlags(QGraphicsItem.ItemClipsToShape)
-        h.setCacheMode(QGraphicsItem.NoCache)
         h.setZValue(1)
         return h
 
-    # apply_transform takes extant svg_xml and returns a QTransform()
     # noinspection PyMethodMayBeStatic
     def node_transform(self, xml_node):
-        current_transform = xml_node.get('transform')
-        current_transform_gathered = {}
-
-        if current_transform is not None:
-            for rx_key, rx in rx_dict.items():
-                match = rx.search(current_transform)
-                if match:
-                    e = [float(n) for n in match.group(rx_key).split(' ')]
-                    current_transform_gathered[rx_key] = e
-
-        transform = QTransform()
-
-        if 'translate' in current_transform_gathered:
-            translate = current_transform_gathered['translate']
-        else:
-            translate = [0, 0]
-
-        if 'rotate' in current_transform_gathered:
-            #print('rotated', xml_node.attrib)
-            pass
-
-        if 'matrix' in current_transform_gathered:
-            matrix = current_transform_gathered['matrix']
-        else:
-            matrix = [1, 0, 0, -1, translate[0], translate[1]]
-
-        attributes_copy = ['width', 'height', 'x', 'y']
-
-        apos = {'matrix': matrix}
+        return node_transform(xml_node)
 
-        for n in attributes_copy:
-            i = xml_node.get(n)
-            if i is not None:
-                apos[n] = float(i)
-
-        x_offset = (apos["x"] * matrix[0])
-        y_offset = (apos["y"] * matrix[0])
-
-        m11 = float(matrix[0])  #m11() // Horizontal scaling
-        m12 = transform.m12()  ##;    // Vertical shearing
-        m13 = float(matrix[1])  ##;    // Horizontal Projection
-        m21 = transform.m21()  ##;    // Horizontal shearing
-        m22 = abs(float(matrix[3]))  #m22() // vertical scaling
-        m23 = float(matrix[2])  #m23() // Vertical Projection
-        m31 = float(matrix[4]) + x_offset  #m31() // Horizontal Position (DX) (with centered offset)
-        m32 = float(matrix[5]) + y_offset  #m32() // Vertical Position (DY) (with centered offset)
-        m33 = transform.m33()  ##;    // Additional Projection Factor
-
-        transform.setMatrix(m11, m12, m13, m21, m22, m23, m31, m32, m33)
-        return transform
+    # noinspection PyMethodMayBeStatic
+    def preprocess(self, source_bytes):
+        return preprocess_svg(source_bytes)
 
     # meats
     def load(self, path):
@@ -330,50 +1640,140 @@ class SvgLand(QGraphicsView):
         if not svg_source.exists():
             return
 
-        svg_source_file = svg_source.fileName()
-        svg_filter_file = svg_source.fileName().split('.')[0] + '-filtered.svg'
+        self.cancel_load()
+        prepared = self.pooled_diagram(svg_source.fileName())
+        if prepared is None:
+            prepared = prepare_diagram(svg_source.fileName(), self.diagram_cache, self.stream_threshold,
+                                       live=self.keep_live)
+        self.attach_diagram(self.loader.generation, prepared)
+        self.attach_batch(everything=True)
+
+    # load() without blocking the gui: preprocessing and renderer build run on the loader's pool,
+    # a later load or load_async supersedes this one
+    def load_async(self, path):
+        svg_source = QFile(path)
+        if not svg_source.exists():
+            self.load_failed.emit('%s: no such file' % path)
+            return
+
+        prepared = self.pooled_diagram(svg_source.fileName())
+        if prepared is not None:
+            self.cancel_load()
+            self.attach_diagram(self.loader.generation, prepared)
+            return
+
+        # the shown document keeps attaching until attach_diagram swaps it out: if this load fails, it stays usable
+        self.loader.start(svg_source.fileName(), self.diagram_cache, self.stream_threshold, self.keep_live)
+
+    def pooled_diagram(self, path):
+        if self.renderer_pool is None:
+            return None
+        try:
+            return self.renderer_pool.get(document_key(path))
+        except OSError:
+            return None
+
+    def cancel_load(self):
+        self.attach_timer.stop()
+        self.attach_queue = []
+        self.loader.cancel()
+
+    def load_error(self, generation, message):
+        if generation == self.loader.generation:
+            log.warning('load failed: %s', message)
+            self.load_failed.emit(message)
+
+    # drops the current document: its items leave the scene, its renderer goes once nothing draws with it
+    def unload(self):
+        if self.anchor_layer.scene() is self.scene():
+            self.scene().removeItem(self.anchor_layer)
+        self.anchor_layer = QGraphicsSvgItem()
+        self.anchor_translating = None
+        self.motion.stop()
+        self.live = None
+        self.plush = None
+        self.index = 0
+        self.item_count = 0
+        self.waypoints = []
+        self.item_pool.clear()
+        self.waypoint_index.build([])
+        self.culler.reset()
+        if self.renderer is not None:
+            # pooled renderers stay with the pool, which may hand them to the next view
+            if self.renderer_pool is not None and self.document_key in self.renderer_pool:
+                self.renderer_pool.unpin(self.document_key)
+            else:
+                self.renderer.deleteLater()
+                for level in self.detail_levels:
+                    level.renderer.deleteLater()
+            self.renderer = None
+            self.detail_levels = ()
+            self.document_key = None
+
+    # the anchor draws from a tile pyramid of svg_bytes. the tiles already are its raster cache, so the anchor's own
+    # cache mode is kept aside until leave_tiles
+    def enter_tiles(self, svg_bytes):
+        if self.tiles is None:
+            self.tiles = TilePyramid(self)
+            self.anchor_cache_mode = self.cache_policy.static_modes['anchor']
+            self.cache_policy.static_modes['anchor'] = QGraphicsItem.NoCache
+        self.tiles.set_document(svg_bytes, self.anchor_layer.boundingRect().size(), self.anchor_layer)
+
+    # back to vector drawing with the anchor's cache mode from before enter_tiles; callers re-apply the cache policy
+    def leave_tiles(self):
+        if self.tiles is None:
+            return
+        self.tiles.stop()
+        self.tiles.deleteLater()
+        self.tiles = None
+        self.cache_policy.static_modes['anchor'] = self.anchor_cache_mode
+        self.anchor_cache_mode = None
+
+    # gui half of a load: swaps in the document and shows its anchor, waypoints are queued for attach_batch
+    def attach_diagram(self, generation, prepared):
+        if generation != self.loader.generation:
+            # superseded, but already paid for: worth keeping if the user comes back to it
+            if self.renderer_pool is not None:
+                self.renderer_pool.put(prepared.key, prepared)
+            else:
+                prepared.release()
+            return
+
+        # pinned before the old document is let go, reopening the shown document must not evict it. when another
+        # view got the same document into the pool meanwhile, that one is shown and this one goes
+        if self.renderer_pool is not None:
+            prepared = self.renderer_pool.put(prepared.key, prepared)
+            self.renderer_pool.pin(prepared.key)
+        else:
+            prepared.renderer.setParent(self)
+            for level in prepared.levels:
+                level.renderer.setParent(self)
+        self.unload()
         scene = self.scene()
+        svg_source_file = prepared.path
+        svg_filtered = prepared.svg_bytes
 
-        tree = etree.parse(svg_source_file)
-        root = tree.getroot()
-
-        symbols = {}
-        namespace = "{http://www.w3.org/2000/svg}"
-        svg_item_copied_attributes = ['x', 'y', 'width', 'height', 'transform']
-        symbols_layer = etree.SubElement(root, '{0}g'.format(namespace))
-        symbols_layer.set('id', 'symbols_layer')
-
-        for symbol in root.findall('.//{0}symbol'.format(namespace)):
-            symbols[symbol.get("id")] = symbol
-
-        all_uses = root.findall('.//*{0}use'.format(namespace))
-
-        for use in all_uses:
-            uid = use.get('{http://www.w3.org/1999/xlink}href')
-            par = use.getparent()
-            symbol = root.findall(".//*[@id='%s']" % str(uid[1:]))[0]
-            symbol_fax = etree.SubElement(par, 'g')
-            symbol_fax.set('id', str(uid[1:]))
-            if symbol.tag == '{0}symbol'.format(namespace):
-                for att in svg_item_copied_attributes:
-                    symbol_fax.set(att, use.get(att))
-                for g in symbol:
-                    symbol_fax.append(g)
-                root.remove(symbol)
-                symbols_layer.append(symbol_fax)
-            par.remove(use)
-
-        tree.write(svg_filter_file)
-        print('supersede')
+        # the flattened document goes straight to the renderer, the *-filtered.svg copy is debug only
+        if self.debug_write_filtered:
+            with open(splitext(svg_source_file)[0] + '-filtered.svg', 'wb') as f:
+                f.write(svg_filtered)
         # APPLY SOURCE SVG to SvgLand(QGraphicsView)
-        self.renderer = QSvgRenderer(svg_filter_file)
-        print('renderer set')
+        self.renderer = prepared.renderer
+        self.detail_levels = prepared.levels
+        self.document_key = prepared.key
+        self.bounds_table = prepared.bounds
+        self.live = prepared.live
 
-        self.anchor_layer = SvgLayer(self)
+        self.anchor_layer = SvgAnchorLayer(self)
         self.anchor_layer.setSharedRenderer(self.renderer)
-        self.anchor_layer.setCacheMode(QGraphicsItem.NoCache)
         self.anchor_layer.setFlags(QGraphicsItem.ItemClipsChildrenToShape)
         self.anchor_layer.is_anchor = True
+        self.anchor_layer.cache_role = 'anchor'
+
+        if self.use_tiles:
+            self.enter_tiles(svg_filtered)
+        else:
+            self.leave_tiles()
 
         self.dims_limit = QSizeF(self.renderer.defaultSize())
         self.dims_page = QSizeF(self.anchor_layer.boundingRect().size())
@@ -383,27 +1783,277 @@ class SvgLand(QGraphicsView):
         self.dims_viewport = self.mapToScene(self.dims_viewport_raw).boundingRect()
         scene.setSceneRect(QRectF(self.dims_viewport_raw))
 
-        for layer in root.findall('{0}g'.format(namespace)):
-            #print('main', layer.get("id"))
-            if layer.get('id') == 'symbols_layer':
-                symbols_converted = layer.findall('g')
-                for symbol in symbols_converted:
-                    #print(symbol.get('id'))
-                    symbol_transform = self.node_transform(symbol)
-                    created_symbol_item = self.make_svg_item(symbol.get('id'))
-                    created_symbol_item.setTransform(symbol_transform)
-                    created_symbol_item.transform = symbol_transform
-                    created_symbol_item.usage_type = 'waypoint'
-                    created_symbol_item.setParentItem(self.anchor_layer)
-
-                    if symbol.get('id') == 'plush':
-                        self.plush = created_symbol_item
-
         scene.addItem(self.anchor_layer)
         self.anchor_layer.load_item()
         self.anchor_layer.center(self.dims_viewport)
+        restore, self.restore_view = self.restore_view, None
+        if restore is not None:
+            self.set_view_state(restore)
+        self.cache_policy.apply(self.anchor_layer, self.anchor_layer.scale())
+
+        if self.keep_live and self.watcher is not None:
+            self.watcher.watch(svg_source_file)
+        self.attach_path = svg_source_file
+        self.attach_queue = prepared.bounds.ids
+        self.attach_next = 0
+        self.load_progress.emit(0, len(self.attach_queue))
+        self.attach_timer.start()
+
+    # creates queued waypoint records for at most attach_budget seconds, or all of them. items follow from the
+    # culler once the index is built, except for the plush, which animates and always has one
+    def attach_batch(self, everything=False):
+        deadline = None if everything else time() + self.attach_budget
+        queue = self.attach_queue
+        total = len(queue)
+        table = self.bounds_table
+        waypoints = self.waypoints
+
+        while self.attach_next < total:
+            row = self.attach_next
+            record = WaypointRecord(table, row)
+            waypoints.append(record)
+            self.attach_next += 1
+
+            if queue[row] == 'plush':
+                self.adopt_plush(record)
+
+            if deadline is not None and not self.attach_next & 1023 and time() > deadline:
+                break
+
+        self.item_count = self.attach_next
+        self.load_progress.emit(self.attach_next, total)
+        if self.attach_next < total:
+            return
+
+        self.attach_timer.stop()
+        self.attach_queue = []
+        self.waypoint_index.build(waypoints, self.anchor_layer.boundingRect().size())
+        self.culler.reset()
+        self.anchor_layer.update_view()
+        self.cache_policy.apply_all(self)
+        event(DEBUG, 'load.attached', path=self.attach_path, waypoints=total)
+        self.load_finished.emit(self.attach_path)
+
+    # a waypoint that keeps its item whatever the culler decides (animated or externally driven); returns the item
+    def pin_waypoint(self, record):
+        self.culler.pin(record)
+        return record.item
+
+    # the plush moves between waypoints on navigation: pinned, cached as animated, on a quicker tween
+    def adopt_plush(self, record):
+        self.plush = self.pin_waypoint(record)
+        self.plush.cache_role = 'animated'
         self.plush.load_item()
         self.plush.animator.rate = 60
+        self.cache_policy.apply(self.plush, self.anchor_layer.scale() * self.plush.scale())
+
+    # detail levels that arrive after their document: they go with the pooled document, and to the anchor when it
+    # shows that document. the bytes they came from must still be the document's, an edit in place drops them
+    def attach_levels(self, prepared, svg_bytes, levels):
+        shown = prepared.renderer is self.renderer
+        pooled = self.renderer_pool is not None and self.renderer_pool.entries.get(prepared.key) is prepared
+        current = self.live.svg_bytes if shown and self.live is not None else prepared.svg_bytes
+        if current is not svg_bytes or prepared.levels or not (shown or pooled):
+            for level in levels:
+                level.renderer.deleteLater()
+            return
+        prepared.levels = levels
+        if pooled:
+            self.renderer_pool.evict()
+        if shown:
+            if not pooled:
+                for level in levels:
+                    level.renderer.setParent(self)
+            self.detail_levels = levels
+            self.anchor_layer.update()
+
+    # renderer of the coarsest detail level whose simplification stays within detail_pixels at `scale`,
+    # None where only the full document will do
+    def detail_renderer(self, scale):
+        if self.use_detail_levels:
+            for level in reversed(self.detail_levels):
+                if level.tolerance * scale <= self.detail_pixels:
+                    return level.renderer
+        return None
+
+    # what a reload keeps: the anchor's center and scale, and the navigation position
+    def view_state(self):
+        anchor = self.anchor_layer
+        return anchor.center_x, anchor.center_y, anchor.scale_s, self.index
+
+    def set_view_state(self, state):
+        anchor = self.anchor_layer
+        anchor.center_x, anchor.center_y, scale, self.index = state
+        # never below fitting the page, as zoom_by
+        anchor.scale_s = max(scale, self.dims_viewport_raw.height() / anchor.height)
+        anchor.setScale(anchor.scale_s)
+        anchor.update_view()
+        anchor.sync_animator()
+
+    # reload the shown document whenever its file changes, in place where an edit allows (apply_edit).
+    # documents loaded from now on keep their LiveDiagram, one already shown is flattened again for it here
+    def watch(self, enabled=True):
+        self.keep_live = enabled
+        if not enabled:
+            if self.watcher is not None:
+                self.watcher.unwatch()
+            self.live = None
+            return
+        if self.watcher is None:
+            self.watcher = FileWatcher(self)
+            self.watcher.changed.connect(self.reload)
+        if self.attach_path is None:
+            return
+        self.watcher.watch(self.attach_path)
+        if self.live is None and self.renderer is not None and not self.attach_queue:
+            self.live = self.live_diagram(self.attach_path)
+
+    # LiveDiagram of the shown document; None once its file has moved on, or for documents that stream
+    def live_diagram(self, path):
+        try:
+            if document_key(path) != self.document_key or getsize(path) >= self.stream_threshold:
+                return None
+            with open(path, 'rb') as f:
+                live = LiveDiagram(f.read())
+        except (OSError, etree.LxmlError):
+            return None
+        if [symbol_id for symbol_id, matrix in live.waypoints] != self.bounds_table.ids:
+            return None
+        return live
+
+    # the shown document's file changed. an edit goes in place; without a LiveDiagram, while the document is still
+    # attaching, or with its renderer shared by other views, it is loaded anew and the view state carried over
+    def reload(self, path=None):
+        path = path or self.attach_path
+        if path is None:
+            return
+        shared = self.renderer_pool is not None and self.renderer_pool.pins.get(self.document_key, 0) > 1
+        if self.live is None or self.attach_queue or shared:
+            self.restore_view = self.view_state()
+            self.load_async(path)
+            return
+
+        t = perf_counter()
+        try:
+            key = document_key(path)
+            if self.renderer_pool is not None and key != self.document_key and key in self.renderer_pool:
+                # another view has this version already
+                self.restore_view = self.view_state()
+                self.load_async(path)
+                return
+            with open(path, 'rb') as f:
+                edit = self.live.update(f.read())
+        except (OSError, etree.LxmlError) as e:
+            # a save caught half way, most likely: the document stays as it is until the next one
+            log.warning('reload failed: %s: %s', path, e)
+            self.load_failed.emit('%s: %s' % (path, e))
+            return
+        if edit is not None:
+            self.apply_edit(edit)
+        if self.renderer_pool is not None:
+            prepared = self.renderer_pool.entries.get(self.document_key)
+            if prepared is not None:
+                prepared.svg_bytes = self.live.svg_bytes
+                prepared.bounds = self.bounds_table
+                prepared.levels = self.detail_levels
+            self.renderer_pool.rekey(self.document_key, key)
+        self.document_key = key
+        if gate.debug:
+            event(DEBUG, 'reload', path=path, edited=len(edit) if edit is not None else 0,
+                  measured=len(edit.measure) if edit is not None else 0, ms='%.1f' % ((perf_counter() - t) * 1000))
+        self.reloaded.emit(path)
+
+    # an edit of the shown document, in place. the anchor draws the whole document, so the renderer reloads the new
+    # flattened bytes for any drawn change, but it stays the same renderer: anchor and items keep drawing with it.
+    # rows carried over keep their records, items and index cells; only new rows and those whose use or symbol
+    # changed are measured, indexed and materialized again. center, scale and navigation position stay
+    def apply_edit(self, edit):
+        if edit.svg_bytes is None:
+            return
+        renderer = self.renderer
+        anchor = self.anchor_layer
+        renderer.load(QByteArray(edit.svg_bytes))
+        # the levels show the previous version, the next full load simplifies anew
+        for level in self.detail_levels:
+            level.renderer.deleteLater()
+        self.detail_levels = ()
+        waypoints = edit.waypoints
+        fresh = dict((row, waypoint_geometry(renderer, *waypoints[row])) for row in edit.measure)
+        table = self.bounds_table.edited([symbol_id for symbol_id, matrix in waypoints], edit.source, fresh)
+        self.bounds_table = table
+
+        old_records = self.waypoints
+        records = []
+        for row, old_row in enumerate(edit.source):
+            if old_row is None:
+                record = WaypointRecord(table, row)
+            else:
+                record = old_records[old_row]
+                record.table = table
+                record.row = row
+            records.append(record)
+
+        pool = self.item_pool
+        culler = self.culler
+        index = self.waypoint_index
+        if edit.removed:
+            for record in set(old_records).difference(records):
+                if record.item is not None:
+                    pool.release(record)
+                record.pinned = False
+                culler.shown.discard(record)
+                culler.pinned.discard(record)
+                index.remove(record)
+        for row in edit.measure:
+            record = records[row]
+            if edit.source[row] is None:
+                index.insert(record, table.rect_of(row))
+                continue
+            item = record.item
+            if item is not None:
+                if record.pinned:
+                    item.setElementId(table.ids[row])
+                    item.width, item.height = table.size_of(row)
+                else:
+                    pool.release(record)
+                    pool.acquire(record)
+            index.update(record)
+        index.reorder(records)
+        self.waypoints = records
+        self.item_count = len(records)
+        self.index = min(self.index, max(len(records) - 1, 0))
+        for record in culler.shown:
+            record.item.bounds_row = record.row
+            record.item.setZValue(1.0 + record.row / float(len(table) + 1))
+
+        # a plush whose use went away hands over to the next one
+        if self.plush is not None and (self.plush.record is None or not self.plush.record.pinned):
+            self.plush = None
+        plush_row = table.row('plush')
+        if self.plush is None and plush_row is not None:
+            self.adopt_plush(records[plush_row])
+
+        if edit.page_changed:
+            # the item takes its bounds from the renderer when it is set
+            anchor.setSharedRenderer(renderer)
+            size = anchor.boundingRect().size()
+            anchor.width, anchor.height = size.width(), size.height()
+            anchor.size = QRectF(0, 0, anchor.width, anchor.height)
+            self.dims_limit = QSizeF(renderer.defaultSize())
+            self.dims_page = QSizeF(size)
+            anchor.scale_s = max(anchor.scale_s, self.dims_viewport_raw.height() / anchor.height)
+            anchor.setScale(anchor.scale_s)
+        if self.use_tiles:
+            self.enter_tiles(edit.svg_bytes)
+        elif self.tiles is not None:
+            self.leave_tiles()
+            self.cache_policy.apply(anchor, anchor.scale())
+        culler.region = None
+        anchor.update_view()
+        self.viewport().update()
+
+    def waypoints_moved(self, items):
+        self.waypoint_index.update_many([item.record for item in items if item.record is not None])
 
     #forced displacement
     def svg_move_to(self, loc: QPointF, relative=False):
@@ -415,59 +2065,101 @@ class SvgLand(QGraphicsView):
 
     # move to waypoint position (index)
     def svg_move_to_index(self, index_item):
+        self.motion.stop()
         bq = index_item.get_center_pos()
         aq = self.anchor_layer.mapFromParent(self.dims_center)
         cq = (aq - bq)
         ct = QPointF(self.anchor_layer.center_x, self.anchor_layer.center_y)
-        self.plush.animator.tct = 0
-        self.plush.animator.p2 = bq
+        # the plush comes with its row of the document, which may not be attached yet
+        if self.plush is not None:
+            self.plush.animator.tct = 0
+            self.plush.animator.p2 = bq
         self.anchor_layer.animator.p2 = ct + cq * self.anchor_layer.scale()
         self.anchor_layer.animator.tct = 0
+        self.clock.wake()
+
+    # WaypointRecord under a viewport position from the spatial index, else the anchor when the point is on the page
+    def item_at(self, view_pos):
+        p = self.anchor_layer.mapFromScene(self.mapToScene(view_pos))
+        hit = self.waypoint_index.item_at(p.x(), p.y())
+        if hit is None and self.anchor_layer.contains(p):
+            hit = self.anchor_layer
+        return hit
 
     #naarate sequence
     def set_item_index(self, direction=1):
+        select_a = self.waypoint_index.order
+        if not select_a:
+            return
         self.index += direction
-        select_a = [a for a in self.anchor_layer.childItems()]
         if self.index >= len(select_a):
             self.index = 0
         elif self.index < 0:
             self.index = len(select_a) - 1
         index_item = select_a[self.index]
-        if isinstance(index_item, SvgLayer):
-            print(self.index, index_item, index_item.elementId())
+        if isinstance(index_item, (SvgLayer, WaypointRecord)):
+            if gate.debug:
+                event(DEBUG, 'navigate', index=self.index, id=index_item.elementId())
             self.svg_move_to_index(index_item)
 
+    # paints/sec over the last ten frames and the last paint cost, for the status bar
     def util_paint_timer(self):
-        delta = self.paint_time_delta
-        fms = (1 / delta)
-        n = tuple(self.fps_average)
-        a = (fms + sum(n)) / 10
-
-        if n[-1] != fms:
-            n = n + (fms,)
-
-        if len(n) > 10:
-            n = n[1:]
-
-        self.fps_average = n
+        intervals = [interval for interval in self.profiler.recent('interval', 10) if interval > 0]
+        a = len(intervals) / sum(intervals) if intervals else 0.0
         seconds = int(time() % 60)
 
-        self.string_paint_fps = '%02i | %d paints/sec' % (seconds, a)
+        self.string_paint_fps = '%02i | %d paints/sec %.1f ms' % (seconds, a, self.paint_cost * 1000)
         #self.parent.set_status()
 
+    def toggle_profile_overlay(self):
+        self.profiler.overlay = not self.profiler.overlay
+        if self.profiler.overlay:
+            self.overlay_timer.start()
+        else:
+            self.overlay_timer.stop()
+        self.viewport().update(self.profiler.overlay_rect)
+
+    def dump_profile(self, prefix=None):
+        prefix = prefix or self.profile_dump_prefix
+        paths = self.profiler.dump_json(prefix + '.json'), self.profiler.dump_csv(prefix + '.csv')
+        log.info('frame profile written to %s', ', '.join(paths))
+        return paths
+
+    def sync_update_mode(self, animating=0):
+        animator = getattr(self.anchor_layer, 'animator', None)
+        moving = self.anchor_translating is not None or (animator is not None and animator.is_animating)
+        moving = moving or self.motion.active
+        moving = moving or animating > self.partial_update_limit
+        mode = self.moving_update_mode if moving else self.idle_update_mode
+        if self.viewportUpdateMode() != mode:
+            self.setViewportUpdateMode(mode)
+
+    # every item shown or hidden adds its rect to the update region: big culling passes repaint in full instead
+    def culled(self, count):
+        if count > self.partial_update_limit and self.viewportUpdateMode() != self.moving_update_mode:
+            self.setViewportUpdateMode(self.moving_update_mode)
+            # queued after the scene's dirty item processing
+            QTimer.singleShot(0, self.sync_update_mode)
+
     def wheelEvent(self, evt):
-        if not self.anchor_translating:
-            self.anchor_layer.zoom(evt)
+        if not self.anchor_translating and isinstance(self.anchor_layer, SvgLayer):
+            self.motion.wheel(evt.angleDelta().y(), evt.pos())
 
     def mousePressEvent(self, evt):
-        interact = self.itemAt(evt.pos())
+        # nothing to interact with before a document is attached (loads are asynchronous)
+        if not isinstance(self.anchor_layer, SvgLayer):
+            return super(SvgLand, self).mousePressEvent(evt)
+        interact = self.item_at(evt.pos())
 
-        self.plush.animator.reset_easing()
-        self.plush.animator.p2 = QPointF(self.anchor_layer.mapFromParent(evt.pos()))
+        if self.plush is not None:
+            self.plush.animator.reset_easing()
+            self.plush.animator.p2 = QPointF(self.anchor_layer.mapFromParent(evt.pos()))
+            self.clock.wake()
 
-        if isinstance(interact, SvgLayer):
+        if isinstance(interact, (SvgLayer, WaypointRecord)):
 
-            print(interact.boundingRect().getRect(), interact.sceneBoundingRect().getRect())
+            if gate.debug:
+                event(DEBUG, 'click', id=interact.elementId(), extent=interact.parent_extent())
 
             if evt.button() == Qt.LeftButton and interact is not None:
                 self.parent.set_status('CLICK %s %s' % (interact.usage_type, interact.elementId()))
@@ -476,29 +2168,21 @@ class SvgLand(QGraphicsView):
 
         if not self.anchor_layer.animator.is_animating:
             self.click_start = evt.pos()
-            self.start_center_x = self.anchor_layer.center_x
-            self.start_center_y = self.anchor_layer.center_y
             self.anchor_translating = evt.pos()
+            self.motion.press(evt.pos())
+            self.sync_update_mode()
         else:
             super(SvgLand, self).mousePressEvent(evt)
 
     def mouseMoveEvent(self, evt):
         #self.updateLocation(evt.pos())
         flag = ''
-        if self.anchor_translating:
+        if self.anchor_translating and isinstance(self.anchor_layer, SvgLayer):
             if not self.anchor_layer.animator.is_animating:
-                a_pos = evt.pos()
-                dx = self.anchor_translating.x() - a_pos.x()
-                dy = self.anchor_translating.y() - a_pos.y()
-                self.anchor_layer.center_x = self.start_center_x - dx
-                self.anchor_layer.center_y = self.start_center_y - dy
-                self.anchor_layer.update_view()
-
-                self.anchor_layer.animator.setX(self.anchor_layer.center_x)
-                self.anchor_layer.animator.setY(self.anchor_layer.center_y)
+                self.motion.move(evt.pos())
                 flag = 'translating'
 
-        interact = self.itemAt(evt.pos())
+        interact = self.item_at(evt.pos())
         if interact:
             op = QPointF(self.anchor_layer.mapFromParent(evt.pos()))
             self.string_rel_mouse = ('X %i Y %i %s' % (op.x(), op.y(), flag))
@@ -508,29 +2192,51 @@ class SvgLand(QGraphicsView):
     def mouseReleaseEvent(self, evt):
         if evt.button() == Qt.LeftButton:
             self.mouseMoveEvent(evt)
+            if self.anchor_translating:
+                self.motion.release(evt.pos())
             self.anchor_translating = None
+            self.sync_update_mode()
+
+    # input handling time goes to the profiler; paints are timed in paintEvent
+    def viewportEvent(self, evt):
+        if evt.type() == QEvent.Paint:
+            return super(SvgLand, self).viewportEvent(evt)
+        t = perf_counter()
+        handled = super(SvgLand, self).viewportEvent(evt)
+        self.profiler.add_events(perf_counter() - t)
+        return handled
 
     def event(self, evt):
         if evt.type() == QEvent.KeyPress:
+            t = perf_counter()
             keys = key_event_to_string(evt)
             self.parent.set_status('+'.join(keys))
+            # the placeholder anchor of a view without a document has nothing to move
+            document = isinstance(self.anchor_layer, SvgLayer)
 
-            if 'Space' in keys:
+            if 'Space' in keys and document:
                 self.anchor_layer.center(self.dims_viewport)
-                print('space')
 
-            if 'Up' in keys:
+            if 'Up' in keys and document:
                 self.svg_move_to(QPointF(0.0, -300.0), True)
 
-            if 'Down' in keys:
+            if 'Down' in keys and document:
                 self.svg_move_to(QPointF(0.0, 300.0), True)
 
-            if 'A' in keys:
+            if 'A' in keys and document:
                 self.set_item_index(direction=-1)
 
-            if 'D' in keys:
+            if 'D' in keys and document:
                 self.set_item_index(direction=1)
 
+            if 'F2' in keys:
+                self.toggle_profile_overlay()
+
+            if 'F3' in keys:
+                self.parent.set_status('profile: %s' % ', '.join(self.dump_profile()))
+
+            self.profiler.add_events(perf_counter() - t)
+
             #return True
 
         #super(SvgLand, self).event(evt)
@@ -540,12 +2246,22 @@ class SvgLand(QGraphicsView):
         self.dims_viewport_raw = self.viewport().rect()
         self.dims_viewport = self.mapToScene(self.dims_viewport_raw).boundingRect()
         self.dims_center = QPointF(self.dims_viewport_raw.width() / 2, self.dims_viewport_raw.height() / 2)
+        # a larger viewport may expose culled waypoints
+        if isinstance(self.anchor_layer, SvgLayer):
+            self.anchor_layer.update_view()
 
     def paintEvent(self, evt):
         self.util_paint_timer()
         self.paint_time_delta = time() - self.paint_time  #this is seconds
         self.paint_time = time()
+        t = perf_counter()
         super(SvgLand, self).paintEvent(evt)
+        self.paint_cost = perf_counter() - t
+        self.profiler.frame(self.paint_cost, self.item_count, self.clock.running)
+
+    def drawForeground(self, painter, rect):
+        if self.profiler.overlay:
+            self.profiler.paint_overlay(painter)
 
 
 class MainWindow(QMainWindow):
@@ -585,29 +2301,48 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(self.central_widget)
         self.setWindowTitle("AEROSOL Svg Viewer")
 
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frame)
-        self.timer.start(0)
+        # frames are driven by the viewer's animation clock, which sleeps while nothing moves
+        self.viewer.clock.frame.connect(self.update_frame)
+        self.viewer.load_progress.connect(self.show_load_progress)
+        self.viewer.load_finished.connect(self.loaded)
+        self.viewer.load_failed.connect(self.set_status)
+        self.viewer.reloaded.connect(self.reloaded)
 
         self.resize(1024, 554)
         self.show()
 
     def set_status(self, s_str):
-        self.statusbar.showMessage(str(self.viewer.string_paint_fps) + '\t' + str(self.viewer.string_rel_mouse) + '\t' + s_str)
+        self.viewer.string_cache = self.viewer.cache_policy.report(self.viewer)
+        self.statusbar.showMessage(str(self.viewer.string_paint_fps) + '\t' + str(self.viewer.string_rel_mouse) + '\t' +
+                                   self.viewer.string_cache + '\t' + s_str)
 
     def show_location(self, pt):
         self.statusbar.showMessage("%f %f" % (pt.x(), pt.y()))
 
+    # loads in the background; a newer open cancels one still running
     def open(self, svg_file_path):
-        self.viewer.load(svg_file_path)
+        self.set_status('loading %s' % svg_file_path)
+        self.viewer.load_async(svg_file_path)
+
+    # plain message: set_status walks every item for the cache report
+    def show_load_progress(self, done, total):
+        self.statusbar.showMessage('loading %d/%d waypoints' % (done, total))
 
-    def update_frame(self):
+    def loaded(self, svg_file_path):
+        status = [svg_file_path]
+        if self.viewer.diagram_cache is not None:
+            cache = self.viewer.diagram_cache
+            status.append('cache %d hits %d misses' % (cache.hits, cache.misses))
+        if self.viewer.renderer_pool is not None:
+            status.append(self.viewer.renderer_pool.report())
+        status.append(self.viewer.culler.report())
+        self.set_status('\t'.join(status))
 
-        if self.viewer.plush:
-            self.viewer.plush.animator.idle()
+    def reloaded(self, svg_file_path):
+        self.set_status('reloaded %s\t%s' % (svg_file_path, self.viewer.culler.report()))
 
-        if self.viewer.anchor_layer:
-            self.viewer.anchor_layer.animator.idle()
+    def update_frame(self, dt=0.0):
+        self.viewer.sync_update_mode()
 
         try:
             self.tick_counter += 1
@@ -625,18 +2360,28 @@ class MainWindow(QMainWindow):
                 self.frame_counter = 0
 
         except KeyboardInterrupt:
-            print('KeyboardInterrupt W T F, use QUIT')
+            log.warning('KeyboardInterrupt W T F, use QUIT')
 
 
 if __name__ == '__main__':
 
     import sys
 
+    configure_from_env()
     app = QApplication(sys.argv)
     window = MainWindow()
 
-    if len(sys.argv) == 2:
-        window.open(sys.argv[1])
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    window.viewer.debug_write_filtered = '--write-filtered' in sys.argv
+    window.viewer.use_tiles = '--no-tiles' not in sys.argv
+    if '--no-cache' not in sys.argv:
+        window.viewer.diagram_cache = DiagramCache()
+    window.viewer.renderer_pool = RendererPool()
+    if '--watch' in sys.argv:
+        window.viewer.watch()
+
+    if len(args) == 1:
+        window.open(args[0])
     else:
         print('no file?')
         exit()
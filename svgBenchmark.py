@@ -0,0 +1,899 @@
+import os
+import sys
+import json
+import argparse
+import platform
+import tempfile
+import subprocess
+from math import isclose, cos, sin, tan, radians, pi
+from random import Random
+from re import compile
+from time import perf_counter, process_time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt5.QtCore import Qt, QEvent, QEventLoop, QTimer, QPoint, QPointF, QRectF, QSize, QT_VERSION_STR, \
+    PYQT_VERSION_STR
+from PyQt5.QtGui import QImage, QPainter, QTransform, QWheelEvent, QMouseEvent
+from PyQt5.QtWidgets import QApplication, QGraphicsView, QWidget, QGridLayout
+from PyQt5.QtSvg import QSvgWidget
+from lxml import etree
+from svg import SvgLand, MainWindow, transform_matrix, transform_ops, prepare_diagram, detail_levels
+from svgPool import RendererPool
+from svgSprite import AnimatedSvgIcon, SpriteLibrary
+
+
+# <use> attributes per transform kind, for a 40x20 use at (x, y)
+use_transforms = {
+    'translate': lambda r, x, y: 'x="0" y="0" width="40" height="20" transform="translate(%d %d)"' % (x, y),
+    'xy': lambda r, x, y: 'x="%d" y="%d" width="40" height="20"' % (x, y),
+    'matrix': lambda r, x, y: 'width="40" height="20" transform="matrix(%.3f 0 0 %.3f %d %d)"'
+                              % (r.uniform(0.5, 2), r.uniform(0.5, 2), x, y),
+    'rotate': lambda r, x, y: 'width="40" height="20" transform="translate(%d %d) rotate(%d)"'
+                              % (x, y, r.randrange(360)),
+    'scale': lambda r, x, y: 'width="40" height="20" transform="translate(%d,%d) scale(%.2f)"'
+                             % (x, y, r.uniform(0.5, 2)),
+    'skew': lambda r, x, y: 'width="40" height="20" transform="translate(%d %d) skewX(%d)"'
+                            % (x, y, r.randrange(-30, 30)),
+}
+
+
+# a wandering polyline of n points in small steps, like a traced route
+def random_trace(r, n, width, height):
+    x, y = r.uniform(0, width), r.uniform(0, height)
+    heading = r.uniform(0, 2 * pi)
+    points = []
+    for _ in range(n):
+        heading += r.gauss(0, 0.3)
+        step = r.uniform(1, 4)
+        x = min(max(x + step * cos(heading), 0), width)
+        y = min(max(y + step * sin(heading), 0), height)
+        points.append('%.2f %.2f' % (x, y))
+    return points
+
+
+# synthetic workflow diagram: a background path layer (one diagonal plus n_paths connector polylines of 8 random
+# points, or random_traces of trace_vertices points), n_symbols symbols, n_uses <use> references placed with
+# transform kinds drawn from `transforms`
+def make_workflow_svg(n_uses, n_symbols=20, width=4000, height=2000, seed=1, n_paths=0, transforms=('translate',),
+                      trace_vertices=0):
+    r = Random(seed)
+    out = ['<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+           'width="%d" height="%d" viewBox="0 0 %d %d">' % (width, height, width, height)]
+    out.append('<symbol id="plush" viewBox="0 0 20 20"><circle cx="10" cy="10" r="8" fill="red"/></symbol>')
+    for s in range(n_symbols):
+        out.append('<symbol id="sym%d" viewBox="0 0 40 20"><rect width="40" height="20" fill="#%06x"/></symbol>'
+                   % (s, r.randrange(1 << 24)))
+    out.append('<g id="layer1"><path d="M0 0 L%d %d" stroke="black"/>' % (width, height))
+    for i in range(n_paths):
+        if trace_vertices:
+            points = ' L'.join(random_trace(r, trace_vertices, width, height))
+        else:
+            points = ' L'.join('%d %d' % (r.randrange(width), r.randrange(height)) for _ in range(8))
+        out.append('<path id="edge%d" d="M%s" fill="none" stroke="#555"/>' % (i, points))
+    out.append('<use xlink:href="#plush" x="0" y="0" width="20" height="20" transform="translate(100 100)"/>')
+    for i in range(n_uses):
+        x = r.randrange(width - 40)
+        y = r.randrange(height - 20)
+        # a single kind draws nothing extra, so translate-only documents stay as they always were
+        kind = transforms[0] if len(transforms) == 1 else r.choice(transforms)
+        out.append('<use xlink:href="#sym%d" %s/>' % (i % n_symbols, use_transforms[kind](r, x, y)))
+    out.append('</g></svg>')
+    return '\n'.join(out)
+
+
+def write_workflow_svg(directory, n_uses, **kwargs):
+    path = os.path.join(directory, 'workflow-%d.svg' % n_uses)
+    with open(path, 'w') as f:
+        f.write(make_workflow_svg(n_uses, **kwargs))
+    return path
+
+
+# SvgLand.load wall time across diagram sizes
+def bench_load(counts=(100, 1000, 10000), repeat=3):
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n in counts:
+            path = write_workflow_svg(directory, n)
+            best = None
+            for _ in range(repeat):
+                view = SvgLand()
+                view.resize(1024, 554)
+                t = perf_counter()
+                view.load(path)
+                dt = perf_counter() - t
+                best = dt if best is None else min(best, dt)
+                view.deleteLater()
+                app.processEvents()
+            results.append((n, best))
+            print('load %6d uses: %8.1f ms' % (n, best * 1000))
+    return results
+
+
+# transform string -> expected (m11, m12, m21, m22, dx, dy)
+c30, s30, t30 = cos(radians(30)), sin(radians(30)), tan(radians(30))
+transform_cases = [
+    (None, (1, 0, 0, 1, 0, 0)),
+    ('', (1, 0, 0, 1, 0, 0)),
+    ('translate(10)', (1, 0, 0, 1, 10, 0)),
+    ('translate(10 20)', (1, 0, 0, 1, 10, 20)),
+    ('translate(-10,-2.5e1)', (1, 0, 0, 1, -10, -25)),
+    ('translate( -.5 , +.5 )', (1, 0, 0, 1, -0.5, 0.5)),
+    ('scale(2)', (2, 0, 0, 2, 0, 0)),
+    ('scale(2,-3)', (2, 0, 0, -3, 0, 0)),
+    ('rotate(30)', (c30, s30, -s30, c30, 0, 0)),
+    ('rotate(-30)', (c30, -s30, s30, c30, 0, 0)),
+    ('rotate(90 10 10)', (0, 1, -1, 0, 20, 0)),
+    ('skewX(30)', (1, 0, t30, 1, 0, 0)),
+    ('skewY(30)', (1, t30, 0, 1, 0, 0)),
+    ('matrix(1 2 3 4 5 6)', (1, 2, 3, 4, 5, 6)),
+    ('matrix(1,0,0,-1,-5,7)', (1, 0, 0, -1, -5, 7)),
+    ('translate(10 20) scale(2)', (2, 0, 0, 2, 10, 20)),
+    ('scale(2) translate(10 20)', (2, 0, 0, 2, 20, 40)),
+    ('translate(10,20),scale(2)', (2, 0, 0, 2, 10, 20)),
+    ('translate(5 5)rotate(90)', (0, 1, -1, 0, 5, 5)),
+    ('matrix(1 0 0 1 1 1) matrix(2 0 0 2 0 0)', (2, 0, 0, 2, 1, 1)),
+    # invalid lists are ignored as a whole
+    ('translate(10 20', (1, 0, 0, 1, 0, 0)),
+    ('translate(1 2 3)', (1, 0, 0, 1, 0, 0)),
+    ('rotate(1 2)', (1, 0, 0, 1, 0, 0)),
+    ('bogus(1) translate(5)', (1, 0, 0, 1, 0, 0)),
+    ('translate(5) junk', (1, 0, 0, 1, 0, 0)),
+]
+
+# lists transform_ops must reject: commas anywhere but between arguments or between transforms
+invalid_transforms = [
+    'translate(,10)',
+    ',rotate(5)',
+    'translate(10,)',
+    'translate(10,,20)',
+    'translate(10 20),',
+    'translate(10 20),,scale(2)',
+    'translate,(10)',
+    'scale(2) , , rotate(5)',
+]
+
+
+# transform_matrix against the expected matrices, transform_ops against the invalid lists. False on any mismatch,
+# the command line exits nonzero then
+def check_transforms():
+    failed = 0
+    for text, expected in transform_cases:
+        got = transform_matrix(text)
+        if not all(isclose(g, e, abs_tol=1e-9) for g, e in zip(got, expected)):
+            failed += 1
+            print('transform %r: got %r expected %r' % (text, got, expected))
+    for text in invalid_transforms:
+        got = transform_ops(text)
+        if got is not None:
+            failed += 1
+            print('transform %r: got %r expected it rejected' % (text, got))
+    total = len(transform_cases) + len(invalid_transforms)
+    print('transform cases: %d passed, %d failed' % (total - failed, failed))
+    return failed == 0
+
+
+# the rx_dict scanner SvgLand.node_transform used before the tokenizer, kept for comparison
+legacy_rx_dict = {
+    'translate': compile(r'translate\((?P<translate>[\d.\s]+)\)'),
+    'scale': compile(r'scale\((?P<scale>[\d.\s]+)\)'),
+    'rotate': compile(r'rotate\((?P<rotate>[\d.\s]+)\)'),
+    'matrix': compile(r'matrix\((?P<matrix>[-\d.\s]+)\)')
+}
+
+
+def legacy_node_transform(xml_node):
+    current_transform = xml_node.get('transform')
+    gathered = {}
+    if current_transform is not None:
+        for rx_key, rx in legacy_rx_dict.items():
+            match = rx.search(current_transform)
+            if match:
+                gathered[rx_key] = [float(n) for n in match.group(rx_key).split(' ')]
+    translate = gathered.get('translate', [0, 0])
+    matrix = gathered.get('matrix', [1, 0, 0, -1, translate[0], translate[1]])
+    x = float(xml_node.get('x', 0.0))
+    y = float(xml_node.get('y', 0.0))
+    transform = QTransform()
+    transform.setMatrix(matrix[0], 0, matrix[1], 0, abs(matrix[3]), matrix[2],
+                        matrix[4] + x * matrix[0], matrix[5] + y * matrix[0], 1)
+    return transform
+
+
+# node_transform over n generated nodes drawing from a small pool of repeated transform strings
+def bench_transform(n=20000, distinct=200, repeat=3):
+    r = Random(1)
+    pool = ['translate(%d %d)' % (r.randrange(4000), r.randrange(2000)) for _ in range(distinct)]
+    pool += ['matrix(1 0 0 1 %d %d)' % (r.randrange(4000), r.randrange(2000)) for _ in range(distinct)]
+    nodes = []
+    for i in range(n):
+        node = etree.Element('g')
+        node.set('x', '0')
+        node.set('y', '0')
+        node.set('transform', pool[r.randrange(len(pool))])
+        nodes.append(node)
+
+    view = SvgLand()
+    results = {}
+    for label, fn in (('legacy', legacy_node_transform), ('tokenizer', view.node_transform)):
+        best = None
+        for _ in range(repeat):
+            transform_matrix.cache_clear()
+            t = perf_counter()
+            for node in nodes:
+                fn(node)
+            dt = perf_counter() - t
+            best = dt if best is None else min(best, dt)
+        results[label] = best
+        print('node_transform %-9s %6d nodes: %8.1f ms' % (label, n, best * 1000))
+    return results
+
+
+update_modes = (
+    ('full', QGraphicsView.FullViewportUpdate),
+    ('minimal', QGraphicsView.MinimalViewportUpdate),
+    ('smart', QGraphicsView.SmartViewportUpdate),
+    ('auto', None),
+)
+
+
+# n waypoints animated at once under each viewport update mode: wall time and paint time per frame
+def bench_animation(counts=(10, 100, 1000), frames=60, modes=update_modes):
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_workflow_svg(directory, max(counts))
+        for n in counts:
+            for label, mode in modes:
+                view = SvgLand()
+                view.resize(1024, 554)
+                view.show()
+                view.load(path)
+                if mode is not None:
+                    view.idle_update_mode = mode
+                    view.moving_update_mode = mode
+                items = [view.pin_waypoint(record) for record in view.waypoints[:n]]
+                for item in items:
+                    item.load_item()
+                    item.animator.p2 = item.animator.p1 + QPointF(50, 30)
+                app.processEvents()
+
+                paint = 0.0
+                t = perf_counter()
+                for _ in range(frames):
+                    last_paint = view.paint_time
+                    view.tweens.step()
+                    view.sync_update_mode(view.tweens.animating_count())
+                    app.processEvents()
+                    if view.paint_time != last_paint:
+                        paint += view.paint_cost
+                dt = perf_counter() - t
+
+                results.append((n, label, dt / frames, paint / frames))
+                print('animate %5d waypoints %-8s %7.2f ms/frame %7.2f ms paint'
+                      % (n, label, dt / frames * 1000, paint / frames * 1000))
+                view.close()
+                view.deleteLater()
+                app.processEvents()
+    return results
+
+
+# one frame of n moving tweens: every animator idled on its own vs a single engine step
+def bench_tweens(counts=(100, 1000, 10000), frames=30):
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_workflow_svg(directory, max(counts))
+        view = SvgLand()
+        view.resize(1024, 554)
+        view.load(path)
+        items = [view.pin_waypoint(record) for record in view.waypoints]
+        for item in items:
+            item.load_item()
+        for n in counts:
+            for label in ('per-item', 'batch'):
+                for item in items[:n]:
+                    item.animator.reset_position(item.origin)
+                    item.animator.p2 = item.animator.p1 + QPointF(500, 300)
+                t = perf_counter()
+                for _ in range(frames):
+                    if label == 'batch':
+                        view.tweens.step()
+                    else:
+                        for item in items[:n]:
+                            item.animator.idle()
+                dt = (perf_counter() - t) / frames
+                results.append((n, label, dt))
+                print('tween %6d waypoints %-8s %8.2f ms/frame' % (n, label, dt * 1000))
+        view.deleteLater()
+        app.processEvents()
+    return results
+
+
+# hover hit-testing over n waypoints: QGraphicsView.itemAt vs the SvgLand waypoint index, plus how often they agree
+def bench_hover(counts=(1000, 20000), probes=2000):
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    r = Random(3)
+    with tempfile.TemporaryDirectory() as directory:
+        for n in counts:
+            path = write_workflow_svg(directory, n)
+            view = SvgLand()
+            view.resize(1024, 554)
+            view.load(path)
+            # every waypoint materialized, so itemAt has the full scene to search
+            view.culler.disable()
+            # zoomed in so waypoints are big enough to hit
+            view.anchor_layer.setScale(1.0)
+            view.anchor_layer.scale_s = 1.0
+            view.anchor_layer.update_view()
+            view.waypoint_index.build(view.waypoint_index.order, view.anchor_layer.boundingRect().size())
+            points = [QPoint(r.randrange(1024), r.randrange(554)) for _ in range(probes)]
+
+            t = perf_counter()
+            scene_hits = [view.itemAt(p) for p in points]
+            scene_dt = (perf_counter() - t) / probes
+            t = perf_counter()
+            index_hits = [view.item_at(p) for p in points]
+            index_dt = (perf_counter() - t) / probes
+
+            # the index answers with records, the scene with their items (or the anchor)
+            index_hits = [getattr(hit, 'item', hit) for hit in index_hits]
+            agree = sum(1 for a, b in zip(scene_hits, index_hits) if a is b) / float(probes)
+            results.append((n, scene_dt, index_dt, agree))
+            print('hover %6d waypoints: itemAt %8.1f us  index %6.1f us  agree %.1f%%'
+                  % (n, scene_dt * 1e6, index_dt * 1e6, agree * 100))
+            view.deleteLater()
+            app.processEvents()
+    return results
+
+
+# switching one view back and forth between two documents, with and without a renderer pool
+def bench_switch(n=10000, switches=6):
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for seed in (1, 2):
+            os.mkdir(os.path.join(directory, str(seed)))
+            paths.append(write_workflow_svg(os.path.join(directory, str(seed)), n, seed=seed))
+        for label, pool in (('no pool', None), ('pool', RendererPool())):
+            view = SvgLand()
+            view.resize(1024, 554)
+            view.renderer_pool = pool
+            times = []
+            for i in range(switches):
+                t = perf_counter()
+                view.load(paths[i % 2])
+                times.append(perf_counter() - t)
+                app.processEvents()
+            # the first visit of each document is cold either way
+            warm = sum(times[2:]) / len(times[2:])
+            results.append((n, label, times[0], warm))
+            print('switch %6d uses %-7s first %8.1f ms  later %8.1f ms%s'
+                  % (n, label, times[0] * 1000, warm * 1000, '  ' + pool.report() if pool else ''))
+            view.deleteLater()
+            app.processEvents()
+    return results
+
+
+# an edit of n uses' document, as lines of make_workflow_svg: k uses moved, plus one use dropped and one added
+def edit_workflow_svg(text, k, seed=5):
+    r = Random(seed)
+    lines = text.split('\n')
+    uses = [i for i, line in enumerate(lines) if line.startswith('<use xlink:href="#sym')]
+    for i in r.sample(uses, k):
+        lines[i] = lines[i].replace('translate(', 'translate(%d %d) translate(' % (r.randrange(50), r.randrange(50)))
+    lines.insert(uses[-1] + 1, '<use xlink:href="#sym1" x="0" y="0" width="40" height="20" transform="translate(7 9)"/>')
+    del lines[uses[len(uses) // 2]]
+    return '\n'.join(lines)
+
+
+# SvgLand.reload (in place, through the LiveDiagram) against a full load, for edits of growing size. the edited
+# table must come out as a fresh load of the edited file gives it, and the view must stay where it was
+def bench_reload(n=10000, edits=(1, 10, 100, 1000)):
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_workflow_svg(directory, n)
+        with open(path) as f:
+            original = f.read()
+        symbol = '<symbol id="sym3" viewBox="0 0 40 20"><rect width="40" height="20" fill="#00ff00"/></symbol>'
+        cases = [('%d uses' % k, lambda text, k=k: edit_workflow_svg(text, k)) for k in edits]
+        cases.append(('symbol', lambda text: compile('<symbol id="sym3".*?</symbol>').sub(symbol, text)))
+        cases.append(('background', lambda text: text.replace('<g id="layer1">',
+                                                              '<g id="layer1"><path d="M5 5 L99 99" stroke="red"/>')))
+        view = SvgLand()
+        view.resize(1024, 554)
+        view.keep_live = True
+        for label, edit in cases:
+            with open(path, 'w') as f:
+                f.write(original)
+            view.load(path)
+            app.processEvents()
+            center_x, center_y, scale, index = view.view_state()
+            view.set_view_state((center_x - 300, center_y + 100, scale * 2, 5))
+            state = view.view_state()
+            with open(path, 'w') as f:
+                f.write(edit(original))
+            t = perf_counter()
+            view.reload(path)
+            reload_time = perf_counter() - t
+            app.processEvents()
+            kept = view.view_state() == state
+
+            fresh = SvgLand()
+            fresh.resize(1024, 554)
+            t = perf_counter()
+            fresh.load(path)
+            load_time = perf_counter() - t
+            a, b = view.bounds_table, fresh.bounds_table
+            # copy numbers differ once uses come and go: a kept waypoint keeps its id, a fresh load counts anew
+            same = [i.split('-')[0] for i in a.ids] == [i.split('-')[0] for i in b.ids] and \
+                np.allclose(a.matrix, b.matrix) and np.allclose(a.size, b.size) and \
+                [record.row for record in view.waypoints] == list(range(len(b)))
+            fresh.deleteLater()
+            app.processEvents()
+            results.append((n, label, reload_time, load_time, same, kept))
+            print('reload %6d uses %-10s in place %8.1f ms  full load %8.1f ms  table %s  view %s'
+                  % (n, label, reload_time * 1000, load_time * 1000, 'same' if same else 'DIFFERS',
+                     'kept' if kept else 'MOVED'))
+        view.deleteLater()
+        app.processEvents()
+    return results
+
+
+# the page drawn into a viewport sized image around its center at `scale`, by renderer; -> seconds, image
+def render_page(renderer, size, scale, viewport=QSize(1024, 554), repeat=3):
+    image = QImage(viewport, QImage.Format_ARGB32_Premultiplied)
+    best = None
+    for _ in range(repeat):
+        image.fill(Qt.white)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        t = perf_counter()
+        painter.translate(viewport.width() / 2.0 - size.width() * scale / 2.0,
+                          viewport.height() / 2.0 - size.height() * scale / 2.0)
+        painter.scale(scale, scale)
+        renderer.render(painter, QRectF(0, 0, size.width(), size.height()))
+        painter.end()
+        dt = perf_counter() - t
+        best = dt if best is None else min(best, dt)
+    return best, image
+
+
+# mean per channel difference of two images, 0..1
+def image_difference(a, b):
+    def pixels(image):
+        image = image.convertToFormat(QImage.Format_RGB32)
+        data = image.constBits()
+        data.setsize(image.byteCount())
+        return np.frombuffer(data, dtype=np.uint8).astype(float)
+    return float(np.abs(pixels(a) - pixels(b)).mean()) / 255.0
+
+
+# detail levels of a document with dense traces: what building them adds to a load, and paint time of the page
+# at zoom levels from fitting the viewport to 1:1 with the level SvgLand.detail_renderer picks against the full
+# document, with the mean pixel difference between the two
+def bench_lod(n_paths=200, trace_vertices=2000, n_uses=1000, scales=(0.277, 0.5, 1.0)):
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_workflow_svg(directory, n_uses, n_paths=n_paths, trace_vertices=trace_vertices)
+        t = perf_counter()
+        prepared = prepare_diagram(path)
+        load_time = perf_counter() - t
+        size = prepared.renderer.defaultSize()
+        t = perf_counter()
+        levels = detail_levels(prepared.svg_bytes, size.height())
+        level_time = perf_counter() - t
+        print('lod %d paths x %d vertices: prepare %.1f ms, of which levels %.1f ms: %s'
+              % (n_paths, trace_vertices, load_time * 1000, level_time * 1000,
+                 ', '.join('%g: %d vertices' % (level.tolerance, level.vertices) for level in prepared.levels)))
+        view = SvgLand()
+        view.detail_levels = prepared.levels
+        for scale in scales:
+            full_time, full = render_page(prepared.renderer, size, scale)
+            renderer = view.detail_renderer(scale)
+            level = [level.tolerance for level in prepared.levels if level.renderer is renderer]
+            if renderer is None:
+                renderer = prepared.renderer
+            level_time, simplified = render_page(renderer, size, scale)
+            difference = image_difference(full, simplified)
+            results.append((scale, level[0] if level else None, full_time, level_time, difference))
+            print('lod scale %5.3f level %-5s paint full %7.1f ms  level %7.1f ms  difference %.4f'
+                  % (scale, level[0] if level else '-', full_time * 1000, level_time * 1000, difference))
+        prepared.release()
+        for level in levels:
+            level.renderer.deleteLater()
+        view.deleteLater()
+        app.processEvents()
+    return results
+
+
+# run in a fresh interpreter per measurement: ru_maxrss only ever grows within one process
+stream_probe = """
+import json, resource, sys
+from time import perf_counter
+import svg
+with open(sys.argv[2], 'rb') as f:
+    size = len(f.read())
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t = perf_counter()
+if sys.argv[1] == 'stream':
+    svg_bytes, waypoints = svg.stream_preprocess_svg(sys.argv[2])
+else:
+    with open(sys.argv[2], 'rb') as f:
+        svg_bytes, waypoints = svg.preprocess_svg(f.read())
+dt = perf_counter() - t
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+print(json.dumps({'wall': dt, 'peak_kb': peak, 'size': size, 'out': len(svg_bytes), 'waypoints': len(waypoints)}))
+"""
+
+
+# preprocess_svg (whole tree) vs stream_preprocess_svg (iterparse): wall time and peak memory over the baseline
+def bench_stream(counts=(10000, 100000), n_paths_per_use=2):
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n in counts:
+            path = write_workflow_svg(directory, n, n_paths=n * n_paths_per_use)
+            for label in ('tree', 'stream'):
+                out = subprocess.run([sys.executable, '-c', stream_probe, label, path], cwd=here,
+                                     stdout=subprocess.PIPE, check=True).stdout
+                row = json.loads(out.decode().strip().splitlines()[-1])
+                results.append((n, label, row))
+                print('preprocess %6d uses %-6s %6.1f MB file: %8.1f ms  peak +%7.1f MB  (%.1fx file)'
+                      % (n, label, row['size'] / 1e6, row['wall'] * 1000, row['peak_kb'] / 1024.0,
+                         row['peak_kb'] * 1024.0 / row['size']))
+    return results
+
+
+# a viewer launch as svg.py's __main__ does it, timed from before `import svg`: the import, the window up,
+# its first paint, and the first paint showing the diagram. a fresh interpreter per run, nothing imported ahead
+startup_probe = """
+import json, sys
+from time import perf_counter
+t0 = perf_counter()
+import svg
+marks = {'import': perf_counter() - t0}
+from PyQt5.QtCore import QObject, QEvent, QTimer
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv[:1])
+window = svg.MainWindow()
+view = window.viewer
+
+# marks a paint once it is done: the filter sees the paint event before the view handles it
+def painted():
+    marks.setdefault('paint', view.profiler.last_paint - t0)
+    if 'anchor' in marks and view.profiler.last_paint - t0 > marks['anchor']:
+        marks['diagram_paint'] = view.profiler.last_paint - t0
+        app.quit()
+
+class PaintWatch(QObject):
+    def eventFilter(self, obj, evt):
+        if evt.type() == QEvent.Paint:
+            QTimer.singleShot(0, painted)
+        return False
+
+watch = PaintWatch()
+view.viewport().installEventFilter(watch)
+view.load_progress.connect(lambda done, total: marks.setdefault('anchor', perf_counter() - t0))
+window.open(sys.argv[1])
+marks['window'] = perf_counter() - t0
+QTimer.singleShot(60000, app.quit)
+app.exec_()
+marks['modules'] = sorted(name for name in ('numpy', 'lxml.etree', 'hashlib') if name in sys.modules)
+print(json.dumps(marks))
+"""
+
+
+# cold start of a per-diagram viewer process: milliseconds from before `import svg` to each startup mark,
+# medians over `repeat` fresh interpreters (process is the interpreter's own startup included)
+def bench_startup(n=1000, repeat=5):
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_workflow_svg(directory, n)
+        runs = []
+        for _ in range(repeat):
+            t = perf_counter()
+            out = subprocess.run([sys.executable, '-c', startup_probe, path], cwd=here,
+                                 stdout=subprocess.PIPE, check=True).stdout
+            row = json.loads(out.decode().strip().splitlines()[-1])
+            row['process'] = perf_counter() - t
+            runs.append(row)
+    result = {'uses': n, 'repeat': repeat, 'modules_after_launch': runs[-1]['modules']}
+    for mark in ('import', 'window', 'paint', 'anchor', 'diagram_paint', 'process'):
+        values = [row[mark] for row in runs if mark in row]
+        result[mark + '_ms'] = round(float(np.median(values)) * 1000.0, 3) if values else None
+    print('startup %6d uses: import %6.1f ms  window %6.1f ms  first paint %6.1f ms  diagram paint %6.1f ms  '
+          '(process %6.1f ms)' % (n, result['import_ms'], result['window_ms'], result['paint_ms'] or -1,
+                                   result['diagram_paint_ms'] or -1, result['process_ms']))
+    return result
+
+
+# ---- viewer suite: SvgLand driven headlessly through real Qt events, results as one json document ----
+
+suite_viewport = (1024, 554)
+
+
+def latency_stats(samples):
+    if not len(samples):
+        return {}
+    ms = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+    return {'n': int(len(ms)), 'mean_ms': round(float(ms.mean()), 3), 'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3), 'max_ms': round(float(ms.max()), 3)}
+
+
+# spins the event loop until predicate() holds; False on timeout
+def run_until(predicate, timeout=10.0, step_ms=5):
+    deadline = perf_counter() + timeout
+    while not predicate():
+        if perf_counter() > deadline:
+            return False
+        loop = QEventLoop()
+        QTimer.singleShot(step_ms, loop.quit)
+        loop.exec_()
+    return True
+
+
+def settle(seconds):
+    run_until(lambda: False, timeout=seconds)
+
+
+# the viewer inside the real window: clicks and key handling report through its status bar
+def suite_window():
+    window = MainWindow()
+    window.resize(*suite_viewport)
+    return window
+
+
+def close_window(window):
+    if window.viewer.tiles is not None:
+        window.viewer.tiles.stop()
+    window.close()
+    window.deleteLater()
+    QApplication.processEvents()
+
+
+# a viewport point over bare canvas, so a press starts a pan instead of a navigation
+def empty_point(view, r):
+    w, h = view.viewport().width(), view.viewport().height()
+    for _ in range(1000):
+        p = QPoint(r.randrange(w // 4, 3 * w // 4), r.randrange(h // 4, 3 * h // 4))
+        if view.item_at(p) in (None, view.anchor_layer):
+            return p
+    return QPoint(w // 2, h // 2)
+
+
+# input to the paint showing it: handlers only record input, the animation clock applies it on its next frame.
+# input that changes nothing lets the clock go back to sleep without a paint
+def send(view, evt):
+    painted = view.profiler.last_paint
+    t = perf_counter()
+    QApplication.sendEvent(view.viewport(), evt)
+    run_until(lambda: view.profiler.last_paint != painted or not view.clock.running, timeout=1.0, step_ms=1)
+    return perf_counter() - t
+
+
+def scenario_load(path, repeat=3):
+    app = QApplication.instance()
+    sync = []
+    for _ in range(repeat):
+        window = suite_window()
+        t = perf_counter()
+        window.viewer.load(path)
+        app.processEvents()
+        sync.append(perf_counter() - t)
+        close_window(window)
+
+    # background load: time until the anchor shows, and until every waypoint is attached
+    window = suite_window()
+    view = window.viewer
+    marks = {}
+    t = perf_counter()
+    view.load_progress.connect(lambda done, total: marks.setdefault('anchor', perf_counter() - t))
+    view.load_finished.connect(lambda p: marks.setdefault('finished', perf_counter() - t))
+    view.load_async(path)
+    run_until(lambda: 'finished' in marks, timeout=120.0)
+    close_window(window)
+    return {'sync': latency_stats(sync), 'async_anchor_ms': round(marks.get('anchor', -1) * 1000.0, 3),
+            'async_finished_ms': round(marks.get('finished', -1) * 1000.0, 3)}
+
+
+# wheel notches at jittered points: zoom in, then back out
+def scenario_zoom(view, steps=40, seed=7):
+    r = Random(seed)
+    view.profiler.reset()
+    samples = []
+    w, h = view.viewport().width(), view.viewport().height()
+    for i in range(steps):
+        delta = 120 if i < steps // 2 else -120
+        pos = QPointF(w / 2 + r.uniform(-w / 4, w / 4), h / 2 + r.uniform(-h / 4, h / 4))
+        samples.append(send(view, QWheelEvent(pos, pos, QPoint(), QPoint(0, delta), Qt.NoButton, Qt.NoModifier,
+                                              Qt.NoScrollPhase, False)))
+    run_until(lambda: not view.clock.running, timeout=5.0)
+    return {'steps': latency_stats(samples), 'frames': view.profiler.summary()}
+
+
+# press on empty canvas, drag along a closed loop, release
+def scenario_pan(view, steps=60, radius=200, seed=11):
+    r = Random(seed)
+    view.profiler.reset()
+    start = empty_point(view, r)
+    samples = [send(view, QMouseEvent(QEvent.MouseButtonPress, QPointF(start), Qt.LeftButton, Qt.LeftButton,
+                                      Qt.NoModifier))]
+    # the press nudges the plush tween, let it finish so moves are measured on their own
+    run_until(lambda: not view.clock.running, timeout=5.0)
+    for i in range(1, steps + 1):
+        a = 2 * pi * i / steps
+        pos = QPointF(start.x() + radius * sin(a), start.y() + radius * (1 - cos(a)))
+        samples.append(send(view, QMouseEvent(QEvent.MouseMove, pos, Qt.NoButton, Qt.LeftButton, Qt.NoModifier)))
+    samples.append(send(view, QMouseEvent(QEvent.MouseButtonRelease, QPointF(start), Qt.LeftButton, Qt.NoButton,
+                                          Qt.NoModifier)))
+    run_until(lambda: not view.clock.running, timeout=5.0)
+    return {'steps': latency_stats(samples), 'frames': view.profiler.summary()}
+
+
+# set_item_index hops; each one animates anchor and plush until the clock goes back to sleep
+def scenario_navigate(view, hops=5, timeout=10.0):
+    view.profiler.reset()
+    settles = []
+    for _ in range(hops):
+        t = perf_counter()
+        view.set_item_index(1)
+        run_until(lambda: not view.clock.running, timeout=timeout)
+        settles.append(perf_counter() - t)
+    return {'settle': latency_stats(settles), 'frames': view.profiler.summary()}
+
+
+def suite_meta():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.decode().strip()
+    except OSError:
+        revision = None
+    return {
+        'revision': revision or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'qt': QT_VERSION_STR,
+        'pyqt': PYQT_VERSION_STR,
+        'numpy': np.__version__,
+        'lxml': etree.__version__,
+        'cpus': os.cpu_count(),
+        'qpa': os.environ.get('QT_QPA_PLATFORM'),
+    }
+
+
+# every scenario over generated diagrams of each size in `uses`
+def run_suite(uses=(1000, 10000), transforms=('translate',), paths_per_use=0, n_symbols=20, seed=1, repeat=3,
+              tiles=False):
+    app = QApplication.instance() or QApplication(sys.argv)
+    config = {'uses': list(uses), 'transforms': list(transforms), 'paths_per_use': paths_per_use,
+              'symbols': n_symbols, 'seed': seed, 'repeat': repeat, 'tiles': tiles, 'viewport': suite_viewport}
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n in uses:
+            path = write_workflow_svg(directory, n, n_symbols=n_symbols, seed=seed, transforms=tuple(transforms),
+                                      n_paths=n * paths_per_use)
+            row = {'uses': n, 'bytes': os.path.getsize(path), 'load': scenario_load(path, repeat)}
+            window = suite_window()
+            view = window.viewer
+            view.use_tiles = tiles
+            view.load(path)
+            settle(0.2)
+            row['zoom'] = scenario_zoom(view)
+            row['pan'] = scenario_pan(view)
+            row['navigate'] = scenario_navigate(view)
+            close_window(window)
+            results.append(row)
+            print('suite %6d uses: load %8.1f ms  zoom p95 %7.2f ms  pan p95 %7.2f ms  navigate %7.1f ms'
+                  % (n, row['load']['sync']['p50_ms'], row['zoom']['steps']['p95_ms'],
+                     row['pan']['steps']['p95_ms'], row['navigate']['settle']['p50_ms']))
+    return {'meta': suite_meta(), 'config': config, 'results': results}
+
+
+# a dashboard of n animated spinners: one QSvgWidget (own renderer, re-rasterized every frame) per spinner
+# vs AnimatedSvgIcon blitting from one sprite sheet on a shared ticker; cpu seconds per wall second
+def bench_icons(counts=(50, 200), seconds=2.0, size=24):
+    app = QApplication.instance() or QApplication(sys.argv)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ico', 'rolling.svg')
+    results = []
+
+    def run(n, make, hidden=False):
+        window = QWidget()
+        layout = QGridLayout(window)
+        columns = int(n ** 0.5) + 1
+        icons = [make() for _ in range(n)]
+        for i, icon in enumerate(icons):
+            layout.addWidget(icon, i // columns, i % columns)
+        window.show()
+        if hidden:
+            for icon in icons:
+                icon.hide()
+        app.processEvents()
+        cpu = process_time()
+        t = perf_counter()
+        run_until(lambda: perf_counter() - t > seconds, timeout=seconds + 1.0)
+        load = (process_time() - cpu) / (perf_counter() - t)
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+        return load
+
+    def svg_widget():
+        widget = QSvgWidget()
+        widget.renderer().setFramesPerSecond(60)
+        widget.load(path)
+        widget.setFixedSize(size, size)
+        return widget
+
+    for n in counts:
+        library = SpriteLibrary()
+        t = perf_counter()
+        library.sheet(path, QSize(size, size))
+        build = perf_counter() - t
+        row = {
+            'icons': n,
+            'svg_widget': run(n, svg_widget),
+            'sprite': run(n, lambda: AnimatedSvgIcon(path, QSize(size, size), library=library)),
+            'sprite_hidden': run(n, lambda: AnimatedSvgIcon(path, QSize(size, size), library=library), hidden=True),
+            'sheet_ms': build * 1000.0,
+            'sheet_kb': library.bytes() / 1024.0,
+        }
+        results.append(row)
+        print('icons %4d: QSvgWidget %5.1f%% cpu  sprite %5.1f%% cpu  hidden %5.1f%% cpu  (sheet %.1f ms, %.0f kB)'
+              % (n, row['svg_widget'] * 100, row['sprite'] * 100, row['sprite_hidden'] * 100, row['sheet_ms'],
+                 row['sheet_kb']))
+    return results
+
+
+def run_micro():
+    if not check_transforms():
+        sys.exit(1)
+    bench_transform()
+    bench_load()
+    bench_stream()
+    bench_startup()
+    bench_switch()
+    bench_reload()
+    bench_lod()
+    bench_animation()
+    bench_tweens()
+    bench_hover()
+    bench_icons()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='pyworkflow benchmarks. without --suite: the micro benchmarks')
+    parser.add_argument('--suite', action='store_true', help='load/zoom/pan/navigate scenarios on a headless SvgLand')
+    parser.add_argument('--check', action='store_true', help='only the transform parser cases; exit status 1 on failure')
+    parser.add_argument('--uses', default='1000,10000', help='comma separated <use> counts')
+    parser.add_argument('--transforms', default='translate',
+                        help='comma separated mix of: %s' % ', '.join(sorted(use_transforms)))
+    parser.add_argument('--paths', type=int, default=0, help='background connector paths per use')
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tiles', action='store_true', help='render the anchor through the tile pyramid')
+    parser.add_argument('--json', metavar='FILE', help='write suite results here (default: stdout)')
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    if args.check:
+        sys.exit(0 if check_transforms() else 1)
+    elif not args.suite:
+        run_micro()
+    else:
+        report = run_suite(uses=[int(n) for n in args.uses.split(',')], transforms=args.transforms.split(','),
+                           paths_per_use=args.paths, n_symbols=args.symbols, seed=args.seed, repeat=args.repeat,
+                           tiles=args.tiles)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=1)
+        else:
+            print(json.dumps(report, indent=1))
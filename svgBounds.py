@@ -0,0 +1,120 @@
+from svgLazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+# per-document waypoint geometry, computed once from the renderer's element bounds when a diagram is prepared.
+# rows follow the placement order. per row: size (the item's boundingRect: element bounds at the origin),
+# origin (item origin in anchor coordinates), center (origin + size / 2, what get_center_pos reports) and
+# rect (left, top, right, bottom of the item in anchor coordinates while it sits at its placement).
+# scene rects derive from the anchor layer's scale and position and are rebuilt only after those change.
+class BoundsTable(object):
+    def __init__(self, ids, sizes, matrices):
+        n = len(ids)
+        self.ids = list(ids)
+        self.rows = {}
+        for row, element_id in enumerate(self.ids):
+            self.rows.setdefault(element_id, row)
+        self.size = np.asarray(sizes, dtype=float).reshape(n, 2)
+        # (m11, m12, m21, m22, dx, dy) of each item transform
+        m = np.asarray(matrices, dtype=float).reshape(n, 6)
+        self.matrix = m
+        self.origin = m[:, 4:6].copy()
+        self.center = self.origin + self.size / 2.0
+
+        w = self.size[:, 0:1]
+        h = self.size[:, 1:2]
+        corners_x = np.hstack((np.zeros((n, 1)), w, np.zeros((n, 1)), w))
+        corners_y = np.hstack((np.zeros((n, 1)), np.zeros((n, 1)), h, h))
+        xs = m[:, 0:1] * corners_x + m[:, 2:3] * corners_y + m[:, 4:5]
+        ys = m[:, 1:2] * corners_x + m[:, 3:4] * corners_y + m[:, 5:6]
+        self.rect = np.column_stack((xs.min(axis=1), ys.min(axis=1), xs.max(axis=1), ys.max(axis=1)))
+
+        # plain lists for per-row reads, indexing the arrays one element at a time is slower than a list
+        self.size_rows = self.size.tolist()
+        self.origin_rows = self.origin.tolist()
+        self.center_rows = self.center.tolist()
+        self.rect_rows = self.rect.tolist()
+        self.matrix_rows = m.tolist()
+
+        self.scene = None
+        self.scene_lists = None
+        self.scene_anchor = None
+        self.scene_transform = (1.0, 0.0, 0.0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, element_id):
+        return self.rows.get(element_id)
+
+    def size_of(self, row):
+        return self.size_rows[row]
+
+    def origin_of(self, row):
+        return self.origin_rows[row]
+
+    def center_of(self, row):
+        return self.center_rows[row]
+
+    def rect_of(self, row):
+        return self.rect_rows[row]
+
+    # (m11, m12, m21, m22, dx, dy) of the item transform, e.g. for QTransform(*table.matrix_of(row))
+    def matrix_of(self, row):
+        return self.matrix_rows[row]
+
+    # whether the anchor point (x, y) falls on the row's item: through the inverse of its transform into the
+    # element's own (0, 0, w, h). the rect only bounds rotated and skewed items
+    def contains(self, row, x, y):
+        m11, m12, m21, m22, dx, dy = self.matrix_rows[row]
+        det = m11 * m22 - m12 * m21
+        if det == 0.0:
+            return False
+        x -= dx
+        y -= dy
+        lx = (m22 * x - m21 * y) / det
+        ly = (m11 * y - m12 * x) / det
+        w, h = self.size_rows[row]
+        return 0.0 <= lx < w and 0.0 <= ly < h
+
+    # the table of an edited version of the document: row r of it copies row source[r] of this one, except for new
+    # rows (source None) and the rows in fresh, {row: (size, matrix)} measured anew
+    def edited(self, ids, source, fresh):
+        n = len(ids)
+        src = np.array([-1 if row is None else row for row in source], dtype=int).reshape(n)
+        kept = src >= 0
+        sizes = np.zeros((n, 2))
+        matrices = np.zeros((n, 6))
+        sizes[kept] = self.size[src[kept]]
+        matrices[kept] = self.matrix[src[kept]]
+        for row, (size, matrix) in fresh.items():
+            sizes[row] = size
+            matrices[row] = matrix
+        return BoundsTable(ids, sizes, matrices)
+
+    # all rects in scene coordinates for the anchor's current scale and position. the anchor calls
+    # invalidate() whenever its transform changes; a table shared by several views is rebuilt per anchor
+    def scene_rects(self, anchor):
+        if self.scene is None or self.scene_anchor is not anchor:
+            pos = anchor.pos()
+            scale, x, y = anchor.scale(), pos.x(), pos.y()
+            self.scene = self.rect * scale + (x, y, x, y)
+            self.scene_lists = None
+            self.scene_anchor = anchor
+            self.scene_transform = (scale, x, y)
+        return self.scene
+
+    def scene_rows(self, anchor):
+        if self.scene is None or self.scene_anchor is not anchor:
+            self.scene_rects(anchor)
+        if self.scene_lists is None:
+            self.scene_lists = self.scene.tolist()
+        return self.scene_lists
+
+    def scene_rect_of(self, row, anchor):
+        return self.scene_rows(anchor)[row]
+
+    def invalidate(self):
+        self.scene = None
+        self.scene_lists = None
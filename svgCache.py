@@ -0,0 +1,132 @@
+import os
+import json
+from svgLazy import lazy_import
+
+hashlib = lazy_import('hashlib')
+
+# bump whenever the preprocessed output of SvgLand.preprocess changes shape or meaning
+FORMAT_VERSION = 3
+CACHE_SUFFIX = '.svgcache'
+
+
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pyworkflow')
+
+
+# persistent store of preprocessed diagrams, keyed by source content hash + FORMAT_VERSION.
+# one file per entry: a json header line (waypoint transform table) followed by the flattened svg bytes.
+# recency is the file mtime, touched on every hit; the oldest entries go first once max_bytes is exceeded.
+class DiagramCache(object):
+    def __init__(self, directory=None, max_bytes=256 * 1024 * 1024):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(source_bytes):
+        return '%s-v%d' % (hashlib.sha256(source_bytes).hexdigest(), FORMAT_VERSION)
+
+    # same key as key(), hashed from the file in chunks
+    @staticmethod
+    def file_key(path, chunk=1024 * 1024):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(chunk), b''):
+                digest.update(block)
+        return '%s-v%d' % (digest.hexdigest(), FORMAT_VERSION)
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    # -> (svg_bytes, [(element_id, (m11, m12, m13, m21, m22, m23, m31, m32, m33)), ...]) or None.
+    # an entry that cannot be decoded is deleted, the next load writes a good one
+    def get(self, key):
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                line = f.readline()
+                svg_bytes = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        try:
+            # recency for evict(); a read-only or shared cache directory still serves what it has
+            os.utime(path)
+        except OSError:
+            pass
+
+        try:
+            header = json.loads(line.decode('utf-8'))
+            if header.get('version') != FORMAT_VERSION:
+                self.misses += 1
+                return None
+            waypoints = [(w[0], tuple(w[1])) for w in header['waypoints']]
+        except (ValueError, KeyError, TypeError, IndexError, AttributeError):
+            self.misses += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        self.hits += 1
+        return svg_bytes, waypoints
+
+    def put(self, key, svg_bytes, waypoints):
+        header = json.dumps({'version': FORMAT_VERSION, 'waypoints': waypoints}).encode('utf-8')
+        path = self.entry_path(key)
+        temp = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp, 'wb') as f:
+                f.write(header + b'\n')
+                f.write(svg_bytes)
+            os.replace(temp, path)
+        except OSError:
+            # the cache is best effort, a read-only or full disk just means cold loads
+            return
+        self.evict()
+
+    def entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def size(self):
+        return sum(e[1] for e in self.entries())
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(e[1] for e in entries)
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        for mtime, size, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'bytes': self.size(), 'max_bytes': self.max_bytes}
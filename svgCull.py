@@ -0,0 +1,84 @@
+# materializes the waypoints whose document bounds lie within the viewport plus a margin, so scene paints only walk
+# and clip what can show. index entries are WaypointRecords; pool.acquire(record) gives one an SvgLayer from the
+# view's recycled items, pool.release(record) hands it back. the anchor's update_view reports the viewport in
+# document coordinates every time it moves; the kept region (viewport grown by margin on each side) is recomputed
+# only once the viewport leaves it, or after zooming in has left it more than shrink times the needed area, so
+# most frames of a pan cost a few comparisons. a recompute touches only the records that change state.
+# past max_live records in the region only the viewport itself is materialized, and past max_live in the viewport
+# nothing is: the anchor draws the document anyway, items only add interaction on top. pinned records (the plush)
+# keep their items throughout.
+class ViewportCuller(object):
+    def __init__(self, index, pool, margin=0.5, shrink=9.0, max_live=1000):
+        self.index = index
+        self.pool = pool
+        self.margin = margin
+        self.shrink = shrink
+        self.max_live = max_live
+        self.enabled = True
+        self.region = None
+        self.shown = set()
+        self.pinned = set()
+        self.passes = 0
+        # called with the number of records a pass materialized or released, e.g. to skip region bookkeeping
+        # for big passes
+        self.changed = None
+
+    # after the index is rebuilt: takes over whatever is materialized, the next update culls from scratch
+    def reset(self):
+        self.region = None
+        self.shown = set(record for record in self.index.order if record.item is not None)
+        self.pinned = set(record for record in self.shown if record.pinned)
+
+    def pin(self, record):
+        if record.item is None:
+            self.pool.acquire(record)
+        record.pinned = True
+        self.pinned.add(record)
+        self.shown.add(record)
+
+    def update(self, left, top, right, bottom):
+        if not self.enabled or not len(self.index):
+            return
+        region = self.region
+        if region is not None and region[0] <= left and region[1] <= top and right <= region[2] and \
+                bottom <= region[3] and (region[2] - region[0]) * (region[3] - region[1]) <= \
+                (right - left) * (bottom - top) * self.shrink:
+            return
+
+        mx = (right - left) * self.margin
+        my = (bottom - top) * self.margin
+        self.region = (left - mx, top - my, right + mx, bottom + my)
+        keep = self.index.items_in(self.region)
+        if len(keep) > self.max_live:
+            keep = self.index.items_in((left, top, right, bottom))
+            if len(keep) > self.max_live:
+                keep = set()
+            else:
+                # the margin was dropped: any move leaves the region
+                self.region = (left, top, right, bottom)
+        self.apply(keep | self.pinned)
+
+    def apply(self, keep):
+        release = self.shown - keep
+        acquire = keep - self.shown
+        if self.changed is not None and (release or acquire):
+            self.changed(len(release) + len(acquire))
+        # released first, so acquires reuse their items
+        for record in release:
+            self.pool.release(record)
+        for record in acquire:
+            self.pool.acquire(record)
+        self.shown = keep
+        self.passes += 1
+
+    # every waypoint materialized, as before culling existed; for comparisons
+    def disable(self):
+        self.enabled = False
+        self.apply(set(self.index.order))
+
+    def enable(self):
+        self.enabled = True
+        self.region = None
+
+    def report(self):
+        return 'shown %d/%d' % (len(self.shown), len(self.index))
@@ -1,7 +1,9 @@
 import os
 import sys
-from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QSize
+from PyQt5.QtWidgets import QApplication, QWidget, QGridLayout
 from PyQt5.QtSvg import QSvgWidget
+from svgSprite import AnimatedSvgIcon
 
 
 class AnimatedSvgExample(QSvgWidget):
@@ -16,9 +18,23 @@ class AnimatedSvgExample(QSvgWidget):
         r.load(ico_filename)
 
 
+# the same spinner many times over, as next to the nodes of a dashboard: every icon blits its frame from one
+# shared sprite sheet and one ticker drives them all, instead of a renderer per widget
+class SpinnerDashboardExample(QWidget):
+    def __init__(self, count=200, columns=20):
+        super().__init__()
+        ico_filename = os.path.join(os.path.dirname(__file__), 'ico/rolling.svg')
+        layout = QGridLayout(self)
+        for i in range(count):
+            layout.addWidget(AnimatedSvgIcon(ico_filename, QSize(24, 24)), i // columns, i % columns)
+
+
 def run():
     app = QApplication(sys.argv)
-    mainWindow = AnimatedSvgExample()
+    if '--dashboard' in sys.argv:
+        mainWindow = SpinnerDashboardExample()
+    else:
+        mainWindow = AnimatedSvgExample()
 
     mainWindow.show()
     sys.exit(app.exec_())
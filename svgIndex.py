@@ -0,0 +1,133 @@
+from math import floor, sqrt
+
+
+# uniform grid over waypoint bounds in document (anchor item) coordinates. built once per load, items are
+# re-bucketed when they move; point hit-tests touch one cell, next/previous navigation is a list lookup.
+class WaypointIndex(object):
+    def __init__(self, cell=None):
+        self.cell_hint = cell
+        self.cell = 64.0
+        self.grid = {}
+        self.bounds = {}
+        self.cells = {}
+        self.order = []
+        self.position = {}
+
+    def __len__(self):
+        return len(self.order)
+
+    # items that know their own extent (SvgLayer.parent_extent) spare the boundingRect query
+    @staticmethod
+    def rect_of(item):
+        extent = getattr(item, 'parent_extent', None)
+        if extent is not None:
+            return extent()
+        r = item.mapRectToParent(item.boundingRect())
+        return r.left(), r.top(), r.right(), r.bottom()
+
+    def build(self, items, extent=None):
+        self.grid = {}
+        self.bounds = {}
+        self.cells = {}
+        self.order = list(items)
+        self.position = dict((item, i) for i, item in enumerate(self.order))
+
+        rects = [self.rect_of(item) for item in self.order]
+        if self.cell_hint:
+            self.cell = float(self.cell_hint)
+        elif rects:
+            # roughly a couple of items per cell, never finer than the typical item
+            if extent is not None:
+                area = extent.width() * extent.height()
+            else:
+                area = (max(r[2] for r in rects) - min(r[0] for r in rects)) * \
+                       (max(r[3] for r in rects) - min(r[1] for r in rects))
+            typical = sorted(max(r[2] - r[0], r[3] - r[1]) for r in rects)[len(rects) // 2]
+            self.cell = max(typical, sqrt(area / len(rects)) * 1.5, 1.0)
+
+        for item, rect in zip(self.order, rects):
+            self.insert(item, rect)
+
+    def cell_range(self, rect):
+        c = self.cell
+        return (int(floor(rect[0] / c)), int(floor(rect[1] / c)),
+                int(floor(rect[2] / c)), int(floor(rect[3] / c)))
+
+    def insert(self, item, rect):
+        self.bounds[item] = rect
+        x0, y0, x1, y1 = self.cell_range(rect)
+        keys = []
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                key = (cx, cy)
+                self.grid.setdefault(key, []).append(item)
+                keys.append(key)
+        self.cells[item] = keys
+
+    def remove(self, item):
+        for key in self.cells.pop(item, ()):
+            bucket = self.grid[key]
+            bucket.remove(item)
+            if not bucket:
+                del self.grid[key]
+        self.bounds.pop(item, None)
+
+    def add(self, item):
+        self.position[item] = len(self.order)
+        self.order.append(item)
+        self.insert(item, self.rect_of(item))
+
+    # new stacking and navigation order for the indexed items, e.g. after an edit of the document; buckets stay
+    def reorder(self, items):
+        self.order = list(items)
+        self.position = dict((item, i) for i, item in enumerate(self.order))
+
+    # re-bucket after a move, cheap when the item stays within its cells
+    def update(self, item):
+        if item not in self.bounds:
+            return
+        rect = self.rect_of(item)
+        if self.cell_range(rect) == self.cell_range(self.bounds[item]):
+            self.bounds[item] = rect
+            return
+        self.remove(item)
+        self.insert(item, rect)
+
+    def update_many(self, items):
+        for item in items:
+            self.update(item)
+
+    # topmost waypoint under the document point (x, y): highest z, then latest in stacking order. the bounds only
+    # narrow it down, items that can tell (parent_contains) decide for their rotated or skewed shape
+    def item_at(self, x, y):
+        c = self.cell
+        hit = None
+        hit_key = None
+        for item in self.grid.get((int(floor(x / c)), int(floor(y / c))), ()):
+            r = self.bounds[item]
+            if r[0] <= x < r[2] and r[1] <= y < r[3] and item.isVisible():
+                contains = getattr(item, 'parent_contains', None)
+                if contains is not None and not contains(x, y):
+                    continue
+                key = (item.zValue(), self.position.get(item, -1))
+                if hit is None or key > hit_key:
+                    hit = item
+                    hit_key = key
+        return hit
+
+    # every waypoint whose bounds intersect the document rect (x0, y0, x1, y1)
+    def items_in(self, rect):
+        x0, y0, x1, y1 = self.cell_range(rect)
+        found = set()
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                for item in self.grid.get((cx, cy), ()):
+                    if item in found:
+                        continue
+                    r = self.bounds[item]
+                    if r[0] <= rect[2] and r[2] >= rect[0] and r[1] <= rect[3] and r[3] >= rect[1]:
+                        found.add(item)
+        return found
+
+    def item_by_index(self, index):
+        return self.order[index]
@@ -0,0 +1,30 @@
+from importlib import import_module
+
+# one stand-in per module name, shared by every module that defers it
+lazy_modules = {}
+
+
+# stand-in for a module that is imported on first attribute access. the module's namespace is then copied into the
+# stand-in, so later lookups cost what they cost on the module itself. concurrent first accesses are serialized by
+# the import system's module lock, whichever thread gets there first pays for the import.
+class LazyModule(object):
+    def __init__(self, name):
+        self.__dict__['__lazy_name__'] = name
+
+    # only reached while nothing is copied yet
+    def __getattr__(self, attr):
+        module = import_module(self.__dict__['__lazy_name__'])
+        self.__dict__.update(vars(module))
+        return getattr(module, attr)
+
+    # True once some user of the stand-in has paid for the import
+    @property
+    def loaded(self):
+        return '__name__' in self.__dict__
+
+
+def lazy_import(name):
+    module = lazy_modules.get(name)
+    if module is None:
+        module = lazy_modules.setdefault(name, LazyModule(name))
+    return module
@@ -0,0 +1,204 @@
+from math import ceil, log10
+from re import compile
+
+from svgLazy import lazy_import
+
+np = lazy_import('numpy')
+
+# path data tokens: a command letter or a number
+path_tokens = compile(r'([A-Za-z])|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+path_numbers = compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+# one absolute moveto followed by absolute linetos only: every number is a coordinate, in order
+plain_polyline = compile(r'\s*M[^A-DF-Za-df-z]*(?:L[^A-DF-Za-df-z]*)*$')
+plain_separators = str.maketrans('ML,', '   ')
+
+
+# path data made of straight segments only (M, L, H, V, Z), as [(points, closed), ...] in absolute coordinates.
+# None for anything with curves or arcs: those stay as they are
+def parse_polylines(d):
+    if plain_polyline.match(d):
+        try:
+            numbers = np.array(d.translate(plain_separators).split(), dtype=float)
+        except ValueError:
+            # numbers written without separators (10-5, .5.5)
+            numbers = np.array(path_numbers.findall(d), dtype=float)
+        if len(numbers) % 2:
+            return None
+        return [(numbers.reshape(-1, 2), False)]
+
+    subpaths = []
+    points = []
+    x = y = sx = sy = 0.0
+    command = None
+    args = []
+    for letter, number in path_tokens.findall(d):
+        if letter:
+            if letter not in 'MmLlHhVvZz':
+                return None
+            command = letter
+            args = []
+            if letter in 'Zz':
+                if points:
+                    subpaths.append((points, True))
+                points = []
+                x, y = sx, sy
+            continue
+        if command is None or command in 'Zz':
+            return None
+        args.append(float(number))
+        if len(args) < (1 if command in 'HhVv' else 2):
+            continue
+        relative = command.islower()
+        upper = command.upper()
+        if upper == 'H':
+            x = args[0] + x if relative else args[0]
+        elif upper == 'V':
+            y = args[0] + y if relative else args[0]
+        elif relative:
+            x, y = x + args[0], y + args[1]
+        else:
+            x, y = args
+        args = []
+        if upper == 'M':
+            if points:
+                subpaths.append((points, False))
+            points = [(x, y)]
+            sx, sy = x, y
+            # coordinate pairs after a moveto are linetos
+            command = 'l' if relative else 'L'
+        else:
+            if not points:
+                # drawing on after a closepath starts where that subpath started
+                points = [(sx, sy)]
+            points.append((x, y))
+    if points:
+        subpaths.append((points, False))
+    return subpaths
+
+
+# Douglas-Peucker once for all tolerances down to `floor`, over many polylines laid end to end in `points`:
+# `ends` are the indices of their first and last vertices, those always stay. a vertex survives simplification at
+# tolerance t exactly when its importance is above t; a split point's importance is capped by that of the split it
+# came from, so what a coarser tolerance keeps is always a subset of what a finer one keeps. every pass splits all
+# open spans at once
+def vertex_importance(points, ends, floor):
+    xs = np.ascontiguousarray(points[:, 0])
+    ys = np.ascontiguousarray(points[:, 1])
+    importance = np.zeros(len(points))
+    importance[ends] = np.inf
+    starts = ends[:-1]
+    stops = ends[1:]
+    caps = np.full(len(starts), np.inf)
+    while len(starts):
+        inner = stops - starts - 1
+        open_spans = inner > 0
+        starts, stops, caps, inner = starts[open_spans], stops[open_spans], caps[open_spans], inner[open_spans]
+        if not len(starts):
+            break
+        offsets = np.cumsum(inner) - inner
+        span = np.repeat(np.arange(len(starts)), inner)
+        index = np.arange(len(span)) + np.repeat(starts + 1 - offsets, inner)
+
+        # distance of each inner vertex to its span's chord, per span: |chord x (p - a)| / |chord|
+        ax = xs[starts]
+        ay = ys[starts]
+        cx = xs[stops] - ax
+        cy = ys[stops] - ay
+        length = np.hypot(cx, cy)
+        degenerate = length == 0.0
+        length[degenerate] = 1.0
+        ux = np.repeat(cx / length, inner)
+        uy = np.repeat(cy / length, inner)
+        bx = xs[index] - np.repeat(ax, inner)
+        by = ys[index] - np.repeat(ay, inner)
+        distance = np.abs(ux * by - uy * bx)
+        if degenerate.any():
+            # rings: distance to the point they start and end at
+            ring = np.repeat(degenerate, inner)
+            distance[ring] = np.hypot(bx[ring], by[ring])
+
+        # farthest vertex of each span, the first one on ties
+        worst = np.maximum.reduceat(distance, offsets)
+        candidates = np.flatnonzero(distance == np.repeat(worst, inner))
+        split = index[candidates[np.unique(span[candidates], return_index=True)[1]]]
+        worst = np.minimum(worst, caps)
+        # spans with nothing that survives the finest tolerance are done
+        keep = worst > floor
+        split, worst = split[keep], worst[keep]
+        importance[split] = worst
+        starts = np.concatenate((starts[keep], split))
+        stops = np.concatenate((split, stops[keep]))
+        caps = np.concatenate((worst, worst))
+    return importance
+
+
+# path data for simplified subpaths: [(points, closed), ...] with points an (n, 2) array. coordinates are written
+# to a quarter of the tolerance, finer digits would not show
+def polylines_d(subpaths, tolerance):
+    digits = max(0, int(ceil(-log10(tolerance / 4.0))))
+    pair = '%.{0}f %.{0}f'.format(digits)
+    out = []
+    for points, closed in subpaths:
+        if not len(points):
+            continue
+        # one format call per subpath
+        out.append('M' + (pair + ' L') * (len(points) - 1) % tuple(points[:-1].ravel().tolist()) +
+                   pair % tuple(points[-1].tolist()))
+        if closed:
+            out.append('Z')
+    return ' '.join(out)
+
+
+# path elements of one document reduced to what Douglas-Peucker keeps of them at each tolerance (document units).
+# add() every path with the scale it is drawn at, then simplify(); a closed subpath is simplified as the ring
+# through its first point
+class SimplifiedPaths(object):
+    def __init__(self):
+        self.nodes = []
+        self.scales = []
+        # per node: [(first vertex, past the last one, closed), ...] into the vertices laid end to end
+        self.subpaths = []
+        self.chunks = []
+        self.vertices = 0
+        self.points = None
+        self.importance = None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def add(self, node, subpaths, scale):
+        spans = []
+        for points, closed in subpaths:
+            points = np.asarray(points, dtype=float)
+            if closed:
+                points = np.vstack((points, points[:1]))
+            spans.append((self.vertices, self.vertices + len(points), closed))
+            self.chunks.append(points * scale)
+            self.vertices += len(points)
+        self.nodes.append(node)
+        self.scales.append(scale)
+        self.subpaths.append(spans)
+
+    def simplify(self, floor):
+        self.points = np.vstack(self.chunks)
+        self.chunks = []
+        ends = sorted(set(i for spans in self.subpaths for start, stop, closed in spans for i in (start, stop - 1)))
+        self.importance = vertex_importance(self.points, np.array(ends), floor)
+
+    def kept(self, tolerance):
+        return int(np.count_nonzero(self.importance > tolerance))
+
+    # new path data of each node at tolerance: [(node, d), ...]
+    def data(self, tolerance):
+        keep = self.importance > tolerance
+        out = []
+        for node, scale, spans in zip(self.nodes, self.scales, self.subpaths):
+            subpaths = []
+            for start, stop, closed in spans:
+                kept = keep[start:stop]
+                # the ring's closing vertex comes back with Z
+                if closed:
+                    kept = kept[:-1]
+                subpaths.append((self.points[start:stop][kept] / scale, closed))
+            out.append((node, polylines_d(subpaths, tolerance / scale)))
+        return out
@@ -0,0 +1,49 @@
+import os
+import logging
+from logging import DEBUG
+
+# below DEBUG: per-frame events (tween steps, clock ticks)
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
+
+log = logging.getLogger('pyworkflow')
+
+
+# level flags for hot loops: a disabled level costs one slot read, no call and no message formatting.
+# kept in sync by set_level(), so change the level through it rather than on the logger directly.
+class LogGate(object):
+    __slots__ = ('debug', 'trace')
+
+    def __init__(self):
+        self.debug = False
+        self.trace = False
+
+    def refresh(self):
+        self.debug = log.isEnabledFor(DEBUG)
+        self.trace = log.isEnabledFor(TRACE)
+
+
+gate = LogGate()
+
+
+def set_level(level):
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    log.setLevel(level)
+    gate.refresh()
+
+
+# structured record: "name k=v ..." as the message, the raw name/fields on the record for handlers
+def event(level, name, **fields):
+    if log.isEnabledFor(level):
+        text = ' '.join('%s=%s' % kv for kv in sorted(fields.items()))
+        log.log(level, '%s %s', name, text, extra={'event': name, 'fields': fields})
+
+
+# PYWORKFLOW_LOG=debug|trace|info... turns logging on for the viewer process
+def configure_from_env(var='PYWORKFLOW_LOG'):
+    level = os.environ.get(var)
+    if level:
+        logging.basicConfig(format='%(relativeCreated)9.1f %(levelname)-5s %(message)s')
+        set_level(level)
+
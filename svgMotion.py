@@ -0,0 +1,151 @@
+from collections import deque
+from math import exp, hypot, log
+from time import perf_counter
+
+# ln of the per-wheel-unit zoom factor SvgLayer.zoom has always used: scale *= 1.0025 ** -angle
+WHEEL_LOG_STEP = log(1.0025)
+
+
+# input coalescing and kinetic motion for a view's anchor layer. the event handlers only record wheel deltas
+# and drag positions; step() applies them once per AnimationClock frame, so a touchpad sending hundreds of
+# events a second costs one transform update and one repaint per frame. wheel zoom eases toward its target
+# scale (zoom_half_life seconds for half the remaining way, 0 applies it in the next frame) and a released
+# drag keeps panning with the pointer's last velocity, decaying by pan_friction per second.
+class KineticMotion(object):
+    def __init__(self, view):
+        self.view = view
+        self.zoom_half_life = 0.035
+        self.pan_friction = 5.0
+        # px/s: slower releases just stop, faster flings are capped
+        self.min_speed = 30.0
+        self.max_speed = 5000.0
+        # drag samples younger than this (seconds) decide the release velocity
+        self.velocity_window = 0.08
+
+        # pending zoom as a natural-log scale factor, applied about zoom_pos (view coordinates)
+        self.pending_zoom = 0.0
+        self.zoom_pos = None
+        self.dragging = False
+        self.drag_origin = None
+        self.drag_center = (0.0, 0.0)
+        self.drag_target = None
+        self.samples = deque(maxlen=32)
+        self.velocity = (0.0, 0.0)
+
+    # input or momentum left for the next frame. a held but resting drag is not: the next move wakes the clock
+    @property
+    def active(self):
+        return self.drag_target is not None or self.pending_zoom != 0.0 or self.velocity != (0.0, 0.0)
+
+    def stop(self):
+        self.pending_zoom = 0.0
+        self.zoom_pos = None
+        self.dragging = False
+        self.drag_target = None
+        self.samples.clear()
+        self.velocity = (0.0, 0.0)
+
+    def wheel(self, angle, pos):
+        self.pending_zoom -= angle * WHEEL_LOG_STEP
+        self.zoom_pos = pos
+        self.view.clock.wake()
+
+    # a press halts any fling; the drag then pins the page point under the pointer
+    def press(self, pos):
+        anchor = self.view.anchor_layer
+        self.velocity = (0.0, 0.0)
+        self.dragging = True
+        self.drag_origin = (pos.x(), pos.y())
+        self.drag_center = (anchor.center_x, anchor.center_y)
+        self.drag_target = None
+        self.samples.clear()
+        self.samples.append((perf_counter(), pos.x(), pos.y()))
+
+    def move(self, pos):
+        if not self.dragging:
+            return
+        x, y = pos.x(), pos.y()
+        self.samples.append((perf_counter(), x, y))
+        self.drag_target = (self.drag_center[0] + x - self.drag_origin[0],
+                            self.drag_center[1] + y - self.drag_origin[1])
+        self.view.clock.wake()
+
+    def release(self, pos):
+        if not self.dragging:
+            return
+        self.move(pos)
+        self.dragging = False
+        self.velocity = self.release_velocity()
+        self.view.clock.wake()
+
+    # pointer velocity over the last velocity_window seconds before release. a pointer that rested longer
+    # than that leaves only the release sample in the window, and no momentum
+    def release_velocity(self):
+        t1, x1, y1 = self.samples[-1]
+        t0, x0, y0 = t1, x1, y1
+        for t, x, y in reversed(self.samples):
+            if t1 - t > self.velocity_window:
+                break
+            t0, x0, y0 = t, x, y
+        if t1 - t0 <= 0.0:
+            return 0.0, 0.0
+        vx = (x1 - x0) / (t1 - t0)
+        vy = (y1 - y0) / (t1 - t0)
+        speed = hypot(vx, vy)
+        if speed < self.min_speed:
+            return 0.0, 0.0
+        if speed > self.max_speed:
+            vx *= self.max_speed / speed
+            vy *= self.max_speed / speed
+        return vx, vy
+
+    # one frame of accumulated input and momentum; True while there is more to come
+    def step(self, dt):
+        view = self.view
+        anchor = view.anchor_layer
+        if getattr(anchor, 'zoom_by', None) is None:
+            # nothing loaded yet
+            self.stop()
+            return False
+
+        if self.pending_zoom != 0.0:
+            if self.zoom_half_life > 0.0 and abs(self.pending_zoom) > 0.002:
+                applied = self.pending_zoom * (1.0 - 0.5 ** (dt / self.zoom_half_life))
+            else:
+                applied = self.pending_zoom
+            self.pending_zoom -= applied
+            x, y = anchor.center_x, anchor.center_y
+            if not anchor.zoom_by(exp(applied), self.zoom_pos) and applied < 0.0:
+                # zoomed out to fitting the page: nothing left to do
+                self.pending_zoom = 0.0
+            if self.dragging:
+                # a drag keeps holding the page point it grabbed through a zoom
+                dx, dy = anchor.center_x - x, anchor.center_y - y
+                self.drag_center = (self.drag_center[0] + dx, self.drag_center[1] + dy)
+                if self.drag_target is not None:
+                    self.drag_target = (self.drag_target[0] + dx, self.drag_target[1] + dy)
+
+        if self.drag_target is not None:
+            anchor.center_x, anchor.center_y = self.drag_target
+            self.drag_target = None
+            anchor.update_view()
+            anchor.sync_animator()
+        elif not self.dragging and self.velocity != (0.0, 0.0):
+            vx, vy = self.velocity
+            x = anchor.center_x + vx * dt
+            y = anchor.center_y + vy * dt
+            anchor.center_x = x
+            anchor.center_y = y
+            anchor.update_view()
+            anchor.sync_animator()
+            # update_view clamps at the page edges: momentum into an edge is spent
+            if anchor.center_x != x:
+                vx = 0.0
+            if anchor.center_y != y:
+                vy = 0.0
+            decay = exp(-self.pan_friction * dt)
+            vx *= decay
+            vy *= decay
+            self.velocity = (vx, vy) if hypot(vx, vy) >= self.min_speed else (0.0, 0.0)
+
+        return self.active
@@ -0,0 +1,122 @@
+import os
+from collections import OrderedDict
+
+# QSvgRenderer node tree per byte of flattened svg, measured on generated workflow diagrams
+RENDERER_BYTES_PER_SVG_BYTE = 6
+PLACEMENT_BYTES = 250
+
+
+# identity of a document on disk: the same file, unchanged since it was last prepared
+def document_key(path):
+    st = os.stat(path)
+    return os.path.realpath(path), st.st_mtime_ns, st.st_size
+
+
+# prepared diagrams (renderer, waypoint bounds table, flattened bytes) of recently open documents, keyed by
+# document_key, so switching back to a document or reopening it skips preprocessing and the renderer build.
+# documents shown by a view are pinned and never evicted; the rest form an LRU bounded by max_bytes.
+# gui thread only: pooled renderers are shared with the scene items drawing them.
+class RendererPool(object):
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.pins = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    # rough footprint: the flattened bytes kept for tiles, the node trees of the renderer and of its detail levels,
+    # and the bounds table
+    @staticmethod
+    def estimate_bytes(prepared):
+        n = len(prepared.svg_bytes) + sum(level.byte_count for level in prepared.levels)
+        return len(prepared.svg_bytes) + n * RENDERER_BYTES_PER_SVG_BYTE + len(prepared.bounds) * PLACEMENT_BYTES
+
+    def size(self):
+        return sum(self.estimate_bytes(prepared) for prepared in self.entries.values())
+
+    def get(self, key):
+        prepared = self.entries.get(key)
+        if prepared is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return prepared
+
+    # -> the entry now pooled under key. a document prepared twice (two views loading it at once) stays the one
+    # that is pinned: its pins belong to the views drawing it, the newcomer is released. an unpinned one is replaced
+    def put(self, key, prepared):
+        old = self.entries.get(key)
+        if old is not None and old is not prepared:
+            if self.pins.get(key):
+                self.entries.move_to_end(key)
+                prepared.release()
+                return old
+            old.release()
+        self.entries[key] = prepared
+        self.entries.move_to_end(key)
+        self.evict()
+        return prepared
+
+    def pin(self, key):
+        self.pins[key] = self.pins.get(key, 0) + 1
+
+    def unpin(self, key):
+        n = self.pins.get(key, 0) - 1
+        if n > 0:
+            self.pins[key] = n
+        else:
+            self.pins.pop(key, None)
+        self.evict()
+
+    # a document edited in place by the view showing it: entry and pins move to the key of the file's new version.
+    # the caller makes sure nothing is pooled under that key yet
+    def rekey(self, old, new):
+        prepared = self.entries.pop(old, None)
+        if prepared is None:
+            return
+        pins = self.pins.pop(old, 0)
+        if pins:
+            self.pins[new] = self.pins.get(new, 0) + pins
+        prepared.key = new
+        self.put(new, prepared)
+
+    # least recently used unpinned documents go first; their renderers once the event loop is back
+    def evict(self):
+        total = self.size()
+        for key in list(self.entries):
+            if total <= self.max_bytes:
+                break
+            if self.pins.get(key):
+                continue
+            prepared = self.entries.pop(key)
+            total -= self.estimate_bytes(prepared)
+            prepared.release()
+            self.evictions += 1
+
+    def clear(self):
+        for key in list(self.entries):
+            if not self.pins.get(key):
+                self.entries.pop(key).release()
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'pinned': len(self.pins),
+            'bytes': self.size(),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def report(self):
+        return 'renderers %d (~%.1f MB) %d hits %d misses' % (len(self.entries), self.size() / 1048576.0,
+                                                              self.hits, self.misses)
@@ -0,0 +1,175 @@
+import csv
+import json
+from time import perf_counter
+
+from PyQt5.QtCore import Qt, QRect, QRectF, QPointF
+from PyQt5.QtGui import QColor, QFont, QPen, QPolygonF
+from svgLazy import lazy_import
+
+np = lazy_import('numpy')
+
+# per-frame record: wall time of the paint, time since the previous paint, paint cost, tween stepping and
+# event handling done since the previous paint, waypoint count, and whether the animation clock was running
+FRAME_FIELDS = ('time', 'interval', 'paint', 'idle', 'events', 'items', 'animating')
+PERCENTILES = (50, 95, 99)
+
+
+# frame-time ring buffer for one view. idle and event time accumulate between paints and are committed
+# with the next frame(); all times are seconds. a frame counts as dropped when the clock was animating
+# through the whole interval and it spanned more than one and a half frame budgets.
+class FrameProfiler(object):
+    def __init__(self, capacity=3600, target_fps=60.0):
+        self.capacity = capacity
+        self.target_fps = target_fps
+        self.enabled = True
+        self.overlay = False
+        self.overlay_rect = QRect(8, 8, 260, 96)
+        self.summary_interval = 0.25
+        self.reset()
+
+    # the ring buffer comes once numpy is there: frames painted before anything else needed numpy (the first
+    # paints of a window whose document is still loading) wait in a list rather than import it on the gui thread
+    def reset(self):
+        self.data = None
+        self.early = []
+        self.count = 0
+        self.head = 0
+        self.last_paint = None
+        self.pending_idle = 0.0
+        self.pending_events = 0.0
+        self.cached_summary = None
+        self.summary_time = 0.0
+
+    @property
+    def budget(self):
+        return 1.0 / self.target_fps
+
+    def add_idle(self, seconds):
+        self.pending_idle += seconds
+
+    def add_events(self, seconds):
+        self.pending_events += seconds
+
+    def frame(self, paint, items=0, animating=False, now=None):
+        if not self.enabled:
+            return
+        if now is None:
+            now = perf_counter()
+        interval = 0.0 if self.last_paint is None else now - self.last_paint
+        self.last_paint = now
+        row = (now, interval, paint, self.pending_idle, self.pending_events, items, animating)
+        if self.data is None and not np.loaded and len(self.early) < self.capacity:
+            self.early.append(row)
+        else:
+            self.buffer()[self.head] = row
+            self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.pending_idle = 0.0
+        self.pending_events = 0.0
+
+    def buffer(self):
+        if self.data is None:
+            self.data = np.zeros((self.capacity, len(FRAME_FIELDS)))
+            if self.early:
+                self.data[:len(self.early)] = self.early
+            self.head = len(self.early) % self.capacity
+            self.early = []
+        return self.data
+
+    # recorded frames, oldest first
+    def frames(self):
+        data = self.buffer()
+        if self.count < self.capacity:
+            return data[:self.count]
+        return np.roll(data, -self.head, axis=0)
+
+    # a field of the last n frames, as a plain list while those are still waiting for the buffer
+    def recent(self, field, n):
+        if self.data is None:
+            return [row[FRAME_FIELDS.index(field)] for row in self.early[-n:]]
+        rows = self.frames()[-n:]
+        return rows[:, FRAME_FIELDS.index(field)]
+
+    def summary(self):
+        rows = self.frames()
+        result = {'frames': int(len(rows)), 'target_fps': self.target_fps}
+        if not len(rows):
+            return result
+
+        interval = rows[:, 1]
+        work = rows[:, 2] + rows[:, 3] + rows[:, 4]
+        for name, column in (('paint', rows[:, 2]), ('idle', rows[:, 3]), ('events', rows[:, 4]), ('work', work)):
+            values = np.percentile(column, PERCENTILES) * 1000.0
+            for p, value in zip(PERCENTILES, values):
+                result['%s_p%d_ms' % (name, p)] = round(float(value), 3)
+
+        # intervals of uninterrupted animation: a paint while animating right after another one
+        animating = rows[:, 6] > 0
+        animated = animating[1:] & animating[:-1]
+        intervals = interval[1:][animated]
+        budget = self.budget
+        late = intervals[intervals > budget * 1.5]
+        result['animated_frames'] = int(animated.sum())
+        result['dropped_frames'] = int(np.sum(np.round(late / budget) - 1))
+        result['over_budget_frames'] = int(np.sum(work > budget))
+        if len(intervals):
+            result['fps'] = round(float(len(intervals) / intervals.sum()), 1) if intervals.sum() > 0 else 0.0
+            for p, value in zip(PERCENTILES, np.percentile(intervals, PERCENTILES) * 1000.0):
+                result['interval_p%d_ms' % p] = round(float(value), 3)
+        result['items'] = int(rows[-1, 5])
+        return result
+
+    # summary() recomputed at most every summary_interval seconds, for per-paint consumers
+    def live_summary(self):
+        now = perf_counter()
+        if self.cached_summary is None or now - self.summary_time > self.summary_interval:
+            self.cached_summary = self.summary()
+            self.summary_time = now
+        return self.cached_summary
+
+    def dump_json(self, path):
+        rows = self.frames()
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(), 'fields': FRAME_FIELDS, 'frames': rows.tolist()}, f)
+        return path
+
+    def dump_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(FRAME_FIELDS)
+            writer.writerows(self.frames().tolist())
+        return path
+
+    # percentiles and a frame-time trace of the last frames, drawn in viewport (device) coordinates
+    def paint_overlay(self, painter):
+        s = self.live_summary()
+        r = self.overlay_rect
+        painter.save()
+        painter.resetTransform()
+        painter.fillRect(r, QColor(0, 0, 0, 170))
+        painter.setPen(QColor(Qt.yellow))
+        painter.setFont(QFont('Helvetica', 8))
+        lines = [
+            '%d frames  %s fps  %d dropped' % (s['frames'], s.get('fps', '-'), s.get('dropped_frames', 0)),
+            'paint p50 %.1f  p95 %.1f  p99 %.1f ms' % (s.get('paint_p50_ms', 0), s.get('paint_p95_ms', 0),
+                                                         s.get('paint_p99_ms', 0)),
+            'work  p50 %.1f  p95 %.1f  p99 %.1f ms' % (s.get('work_p50_ms', 0), s.get('work_p95_ms', 0),
+                                                         s.get('work_p99_ms', 0)),
+            '%d items' % s.get('items', 0),
+        ]
+        for i, line in enumerate(lines):
+            painter.drawText(r.left() + 6, r.top() + 14 + i * 13, line)
+
+        # last frames' work time against the budget line
+        trace = QRectF(r.left() + 6, r.bottom() - 26, r.width() - 12, 22)
+        budget = self.budget
+        painter.setPen(QPen(QColor(255, 80, 80), 0))
+        painter.drawLine(QPointF(trace.left(), trace.center().y()), QPointF(trace.right(), trace.center().y()))
+        rows = self.frames()[-int(trace.width()):]
+        if len(rows):
+            work = np.minimum((rows[:, 2] + rows[:, 3] + rows[:, 4]) / (2.0 * budget), 1.0)
+            points = QPolygonF([QPointF(trace.left() + i, trace.bottom() - w * trace.height())
+                                for i, w in enumerate(work.tolist())])
+            painter.setPen(QPen(QColor(Qt.green), 0))
+            painter.drawPolyline(points)
+        painter.restore()
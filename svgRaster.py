@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import argparse
+from glob import glob
+from multiprocessing import get_context
+from time import perf_counter
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import Qt, QRectF, QByteArray
+from PyQt5.QtGui import QGuiApplication, QImage, QPainter, QColor
+from PyQt5.QtSvg import QSvgRenderer
+from svg import flatten_svg
+from svgCache import DiagramCache
+
+# per worker process state, set up once by init_worker
+worker = {}
+
+
+def parse_size(text):
+    w, _, h = text.lower().partition('x')
+    return int(w), int(h or w)
+
+
+def init_worker(use_cache, background):
+    worker['app'] = QGuiApplication.instance() or QGuiApplication(['svgRaster'])
+    # one renderer per process, reloaded for every document
+    worker['renderer'] = QSvgRenderer()
+    worker['cache'] = DiagramCache() if use_cache else None
+    worker['background'] = QColor(background) if background != 'transparent' else QColor(Qt.transparent)
+
+
+# document fitted into a w x h box, aspect kept
+def fit_rect(doc_size, w, h):
+    if doc_size.isEmpty():
+        return QRectF(0, 0, w, h)
+    scale = min(w / doc_size.width(), h / doc_size.height())
+    dw = doc_size.width() * scale
+    dh = doc_size.height() * scale
+    return QRectF((w - dw) / 2.0, (h - dh) / 2.0, dw, dh)
+
+
+# one source file -> one png per size. returns the per-file report row
+def rasterize(job):
+    path, out_dir, sizes = job
+    row = {'path': path, 'outputs': [], 'error': None, 'pixels': 0}
+    t = perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            source_bytes = f.read()
+        svg_filtered, waypoints, cached = flatten_svg(source_bytes, worker['cache'])
+        row['cached'] = cached
+        row['waypoints'] = len(waypoints)
+        row['preprocess'] = perf_counter() - t
+
+        t = perf_counter()
+        renderer = worker['renderer']
+        if not renderer.load(QByteArray(svg_filtered)):
+            raise ValueError('renderer rejected the preprocessed document')
+        doc_size = renderer.viewBoxF().size()
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for w, h in sizes:
+            image = QImage(w, h, QImage.Format_ARGB32_Premultiplied)
+            image.fill(worker['background'])
+            painter = QPainter(image)
+            painter.setRenderHint(QPainter.Antialiasing)
+            renderer.render(painter, fit_rect(doc_size, w, h))
+            painter.end()
+            out_path = os.path.join(out_dir, '%s-%dx%d.png' % (stem, w, h))
+            if not image.save(out_path, 'PNG'):
+                raise IOError('could not write %s' % out_path)
+            row['outputs'].append(out_path)
+            row['pixels'] += w * h
+        row['render'] = perf_counter() - t
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description='rasterize a directory of workflow svgs to png thumbnails')
+    parser.add_argument('source', help='directory of .svg files, or a single .svg')
+    parser.add_argument('output', help='directory for the png files')
+    parser.add_argument('--size', action='append', type=parse_size, metavar='WxH',
+                        help='output box, repeatable; a single number means a square (default 256)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='worker processes, 1 runs inline')
+    parser.add_argument('--cache', action='store_true', help='reuse preprocessed documents from the diagram cache')
+    parser.add_argument('--background', default='white', help='fill colour, or "transparent"')
+    parser.add_argument('--json', metavar='FILE', help='write the per-file report as json')
+    args = parser.parse_args(argv)
+
+    sizes = args.size or [(256, 256)]
+    if os.path.isdir(args.source):
+        paths = sorted(glob(os.path.join(args.source, '*.svg')))
+    else:
+        paths = [args.source]
+    os.makedirs(args.output, exist_ok=True)
+    jobs = [(path, args.output, sizes) for path in paths]
+
+    t = perf_counter()
+    if args.jobs <= 1 or len(jobs) <= 1:
+        init_worker(args.cache, args.background)
+        rows = [rasterize(job) for job in jobs]
+    else:
+        # spawn: workers get a fresh interpreter instead of a forked copy of Qt state
+        with get_context('spawn').Pool(min(args.jobs, len(jobs)), init_worker,
+                                       (args.cache, args.background)) as pool:
+            rows = pool.map(rasterize, jobs, chunksize=1)
+    wall = perf_counter() - t
+
+    failed = 0
+    pixels = 0
+    for row in rows:
+        if row['error']:
+            failed += 1
+            print('%-40s FAILED %s' % (os.path.basename(row['path']), row['error']))
+            continue
+        pixels += row['pixels']
+        print('%-40s %5d waypoints  preprocess %8.1f ms%s  render %8.1f ms'
+              % (os.path.basename(row['path']), row['waypoints'], row['preprocess'] * 1000,
+                 ' (cached)' if row['cached'] else '', row['render'] * 1000))
+    done = len(rows) - failed
+    print('%d files, %d failed, %.2f s: %.1f files/s, %.1f MP/s'
+          % (len(rows), failed, wall, done / wall if wall else 0.0, pixels / 1e6 / wall if wall else 0.0))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'wall': wall, 'jobs': args.jobs, 'sizes': sizes, 'files': rows}, f, indent=1)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,200 @@
+import os
+from copy import deepcopy
+from math import ceil, sqrt
+
+from lxml import etree
+from PyQt5.QtCore import Qt, QObject, QTimer, QElapsedTimer, QByteArray, QRect, QRectF, QSize
+from PyQt5.QtGui import QImage, QPainter, QPixmap
+from PyQt5.QtSvg import QSvgRenderer
+from PyQt5.QtWidgets import QWidget
+
+SVG_NS = '{http://www.w3.org/2000/svg}'
+ANIMATION_TAGS = tuple(SVG_NS + tag for tag in ('animate', 'animateColor', 'animateMotion', 'animateTransform', 'set'))
+
+
+# seconds of an svg clock value ('1.5s', '200ms', '2'); None for anything event based ('click', 'indefinite')
+def parse_clock(text):
+    text = (text or '0').strip()
+    scale = 1.0
+    if text.endswith('ms'):
+        text, scale = text[:-2], 0.001
+    elif text.endswith('s'):
+        text = text[:-1]
+    try:
+        return float(text) * scale
+    except ValueError:
+        return None
+
+
+# the document as it looks `seconds` into its animations: every animation starts that much earlier, so a renderer
+# loaded from the result draws the frame right away. QSvgRenderer.setCurrentFrame follows the wall clock instead
+def svg_at_time(root, seconds):
+    root = deepcopy(root)
+    for node in root.iter(ANIMATION_TAGS):
+        begin = parse_clock(node.get('begin'))
+        if begin is not None:
+            node.set('begin', '%.6fs' % (begin - seconds))
+    return etree.tostring(root)
+
+
+# every frame of an animated svg at one pixel size, rasterized once into a single pixmap (row major grid).
+# static documents get one frame. playback position is wall time modulo the animation duration
+class SpriteSheet(object):
+    def __init__(self, path, size, fps=30.0, max_frames=120, device_pixel_ratio=1.0):
+        self.path = path
+        self.size = QSize(size)
+        self.device_pixel_ratio = device_pixel_ratio
+        root = etree.parse(path).getroot()
+        renderer = QSvgRenderer(QByteArray(etree.tostring(root)))
+        self.duration = renderer.animationDuration() / 1000.0 if renderer.animated() else 0.0
+        self.frame_count = max(1, min(max_frames, int(round(self.duration * fps))))
+        self.fps = self.frame_count / self.duration if self.duration > 0 else 0.0
+
+        w = int(ceil(size.width() * device_pixel_ratio))
+        h = int(ceil(size.height() * device_pixel_ratio))
+        self.frame_size = QSize(w, h)
+        self.columns = int(ceil(sqrt(self.frame_count)))
+        rows = int(ceil(self.frame_count / float(self.columns)))
+        self.sources = [QRectF(self.frame_rect(i)) for i in range(self.frame_count)]
+        image = QImage(w * self.columns, h * rows, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        for i in range(self.frame_count):
+            if self.frame_count > 1:
+                renderer = QSvgRenderer(QByteArray(svg_at_time(root, i / self.fps)))
+            renderer.render(painter, self.sources[i])
+        painter.end()
+        self.pixmap = QPixmap.fromImage(image)
+        self.pixmap.setDevicePixelRatio(device_pixel_ratio)
+
+    # source rect of frame i in device pixels
+    def frame_rect(self, i):
+        w = self.frame_size.width()
+        h = self.frame_size.height()
+        return QRect((i % self.columns) * w, (i // self.columns) * h, w, h)
+
+    def frame_at(self, seconds):
+        if self.frame_count == 1:
+            return 0
+        return int(seconds * self.fps) % self.frame_count
+
+    def draw(self, painter, target, frame):
+        painter.drawPixmap(target, self.pixmap, self.sources[frame])
+
+    def bytes(self):
+        return self.pixmap.width() * self.pixmap.height() * 4
+
+
+# one timer for every animated icon on show. icons register while shown; the timer runs only while any are,
+# and each tick touches only icons whose frame changed and who have something on screen
+class SpriteTicker(QObject):
+    def __init__(self, parent=None, fps=30.0):
+        super(SpriteTicker, self).__init__(parent)
+        self.icons = set()
+        self.elapsed = QElapsedTimer()
+        self.elapsed.start()
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(max(1, int(round(1000.0 / fps))))
+        self.timer.timeout.connect(self.tick)
+
+    def now(self):
+        return self.elapsed.elapsed() / 1000.0
+
+    def add(self, icon):
+        self.icons.add(icon)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def remove(self, icon):
+        self.icons.discard(icon)
+        if not self.icons:
+            self.timer.stop()
+
+    def tick(self):
+        now = self.now()
+        for icon in list(self.icons):
+            try:
+                icon.advance(now)
+            except RuntimeError:
+                # deleted along with its parent without a hide event
+                self.remove(icon)
+
+
+# sprite sheets by file, size and pixel ratio, shared by every icon created through the library, plus their ticker
+class SpriteLibrary(object):
+    def __init__(self, fps=30.0, max_frames=120):
+        self.fps = fps
+        self.max_frames = max_frames
+        self.sheets = {}
+        self.ticker = SpriteTicker(fps=fps)
+
+    def sheet(self, path, size, device_pixel_ratio=1.0):
+        key = (os.path.realpath(path), size.width(), size.height(), device_pixel_ratio)
+        sheet = self.sheets.get(key)
+        if sheet is None:
+            sheet = self.sheets[key] = SpriteSheet(path, size, self.fps, self.max_frames, device_pixel_ratio)
+        return sheet
+
+    def clear(self):
+        self.sheets = {}
+
+    def bytes(self):
+        return sum(sheet.bytes() for sheet in self.sheets.values())
+
+
+default_library = None
+
+
+def shared_library():
+    global default_library
+    if default_library is None:
+        default_library = SpriteLibrary()
+    return default_library
+
+
+# drop-in for a QSvgWidget playing an animated icon: blits its frame from the shared sprite sheet.
+# hidden icons are off the ticker, covered or scrolled-away icons are skipped by it
+class AnimatedSvgIcon(QWidget):
+    def __init__(self, path, size=QSize(24, 24), parent=None, library=None):
+        super(AnimatedSvgIcon, self).__init__(parent)
+        self.path = path
+        self.icon_size = QSize(size)
+        self.library = library if library is not None else shared_library()
+        self.sheet = None
+        self.frame = 0
+        self.target = QRectF(0, 0, size.width(), size.height())
+        self.setFixedSize(self.icon_size)
+
+    def sizeHint(self):
+        return self.icon_size
+
+    def ensure_sheet(self):
+        ratio = self.devicePixelRatioF()
+        if self.sheet is None or self.sheet.device_pixel_ratio != ratio:
+            self.sheet = self.library.sheet(self.path, self.icon_size, ratio)
+        return self.sheet
+
+    def advance(self, now):
+        frame = self.sheet.frame_at(now)
+        if frame != self.frame:
+            self.frame = frame
+            if not self.visibleRegion().isEmpty():
+                self.update()
+
+    def showEvent(self, evt):
+        if self.ensure_sheet().frame_count > 1:
+            self.frame = self.sheet.frame_at(self.library.ticker.now())
+            self.library.ticker.add(self)
+        super(AnimatedSvgIcon, self).showEvent(evt)
+
+    def hideEvent(self, evt):
+        self.library.ticker.remove(self)
+        super(AnimatedSvgIcon, self).hideEvent(evt)
+
+    def paintEvent(self, evt):
+        sheet = self.sheet or self.ensure_sheet()
+        painter = QPainter(self)
+        painter.drawPixmap(self.target, sheet.pixmap, sheet.sources[self.frame])
+        painter.end()
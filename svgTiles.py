@@ -0,0 +1,186 @@
+from collections import OrderedDict
+from queue import Queue, Empty
+from math import ceil, floor
+
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtCore import Qt, QObject, QRectF, QRunnable, QThreadPool, QByteArray, QCoreApplication, \
+    pyqtSignal, pyqtSlot
+from PyQt5.QtSvg import QSvgRenderer
+from PyQt5.QtWidgets import QStyleOptionGraphicsItem
+
+class TileJob(QRunnable):
+    def __init__(self, pyramid, level, tx, ty):
+        super(TileJob, self).__init__()
+        self.pyramid = pyramid
+        self.generation = pyramid.generation
+        self.svg_bytes = pyramid.svg_bytes
+        self.renderers = pyramid.renderers
+        self.doc_size = pyramid.doc_size
+        self.tile_size = pyramid.tile_size
+        self.scale = pyramid.levels[level]
+        self.level = level
+        self.tx = tx
+        self.ty = ty
+
+    def run(self):
+        t = self.tile_size
+        # renderers are never used by two workers at once: each job borrows one and hands it back
+        try:
+            renderer = self.renderers.get_nowait()
+        except Empty:
+            renderer = QSvgRenderer(QByteArray(self.svg_bytes))
+            # owned by the gui thread, so the python wrapper never dies on a pool thread
+            renderer.moveToThread(QCoreApplication.instance().thread())
+        image = QImage(t, t, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        renderer.render(painter, QRectF(-self.tx * t, -self.ty * t,
+                                        self.doc_size.width() * self.scale, self.doc_size.height() * self.scale))
+        painter.end()
+        self.renderers.put(renderer)
+        self.pyramid.tile_ready.emit(self.generation, self.level, self.tx, self.ty, image)
+
+
+# pre-rasterized anchor document at a few zoom levels, cut into tile_size tiles.
+# tiles are rendered lazily on a background pool and kept in an LRU bounded by max_bytes;
+# past the deepest level the caller falls back to vector rendering.
+class TilePyramid(QObject):
+    tile_ready = pyqtSignal(int, int, int, int, QImage)
+
+    def __init__(self, parent=None, levels=(0.125, 0.25, 0.5, 1.0), tile_size=256, max_bytes=128 * 1024 * 1024):
+        super(TilePyramid, self).__init__(parent)
+        self.levels = tuple(sorted(levels))
+        self.tile_size = tile_size
+        self.max_bytes = max_bytes
+        self.tiles = OrderedDict()
+        self.pending = set()
+        self.generation = 0
+        self.svg_bytes = None
+        self.doc_size = None
+        self.item = None
+        self.renderers = Queue()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, QThreadPool.globalInstance().maxThreadCount() - 1))
+        self.tile_ready.connect(self.store_tile)
+
+    def set_document(self, svg_bytes, doc_size, item):
+        self.generation += 1
+        self.pool.clear()
+        self.tiles.clear()
+        self.pending.clear()
+        # jobs still running keep the previous document's queue
+        self.renderers = Queue()
+        self.svg_bytes = bytes(svg_bytes)
+        self.doc_size = doc_size
+        self.item = item
+
+    def tile_bytes(self):
+        return len(self.tiles) * self.tile_size * self.tile_size * 4
+
+    @pyqtSlot(int, int, int, int, QImage)
+    def store_tile(self, generation, level, tx, ty, image):
+        key = (level, tx, ty)
+        self.pending.discard(key)
+        if generation != self.generation:
+            return
+        self.tiles[key] = image
+        while self.tiles and self.tile_bytes() > self.max_bytes:
+            self.tiles.popitem(last=False)
+        if self.item is not None:
+            self.item.update(self.tile_rect(level, tx, ty))
+
+    def request(self, level, tx, ty):
+        key = (level, tx, ty)
+        if key not in self.pending:
+            self.pending.add(key)
+            self.pool.start(TileJob(self, level, tx, ty))
+
+    # tile rectangle in document (item) coordinates
+    def tile_rect(self, level, tx, ty):
+        s = self.tile_size / self.levels[level]
+        return QRectF(tx * s, ty * s, s, s)
+
+    # smallest level that still has at least one tile pixel per device pixel, None past the deepest one
+    def level_for(self, device_scale):
+        for i, scale in enumerate(self.levels):
+            if scale >= device_scale:
+                return i
+        return None
+
+    # draws the cached tiles over `visible` (item coordinates). returns None when the zoom is deeper
+    # than the pyramid, otherwise the rects no tile or coarser substitute could cover yet.
+    def paint(self, painter, visible):
+        if self.svg_bytes is None:
+            return None
+        device_scale = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        level = self.level_for(device_scale)
+        if level is None:
+            return None
+
+        scale = self.levels[level]
+        t = self.tile_size
+        visible = visible.intersected(QRectF(0, 0, self.doc_size.width(), self.doc_size.height()))
+        missing = []
+        if visible.isEmpty():
+            return missing
+
+        tx0 = int(floor(visible.left() * scale / t))
+        ty0 = int(floor(visible.top() * scale / t))
+        tx1 = int(floor(visible.right() * scale / t))
+        ty1 = int(floor(visible.bottom() * scale / t))
+
+        painter.save()
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        for ty in range(ty0, ty1 + 1):
+            for tx in range(tx0, tx1 + 1):
+                target = self.tile_rect(level, tx, ty)
+                key = (level, tx, ty)
+                image = self.tiles.get(key)
+                if image is not None:
+                    self.tiles.move_to_end(key)
+                    painter.drawImage(target, image)
+                    continue
+                self.request(level, tx, ty)
+                if not self.paint_coarser(painter, level, target):
+                    missing.append(target)
+        painter.restore()
+        return missing
+
+    # the cached tiles of level `coarse` covering `target` (item coordinates) as [(part of target, tx, ty, image)],
+    # None if one of them is missing. levels need not be a power of two apart, so target may straddle several
+    def coarse_pieces(self, coarse, target):
+        t = self.tile_size
+        scale = self.levels[coarse]
+        tx0 = int(floor(target.left() * scale / t))
+        ty0 = int(floor(target.top() * scale / t))
+        tx1 = max(tx0, int(ceil(target.right() * scale / t)) - 1)
+        ty1 = max(ty0, int(ceil(target.bottom() * scale / t)) - 1)
+        pieces = []
+        for ty in range(ty0, ty1 + 1):
+            for tx in range(tx0, tx1 + 1):
+                image = self.tiles.get((coarse, tx, ty))
+                if image is None:
+                    return None
+                pieces.append((target.intersected(self.tile_rect(coarse, tx, ty)), tx, ty, image))
+        return pieces
+
+    # stands in for the missing tile `target` of `level` with the finest coarser level that has all of it cached
+    def paint_coarser(self, painter, level, target):
+        t = self.tile_size
+        for coarse in range(level - 1, -1, -1):
+            pieces = self.coarse_pieces(coarse, target)
+            if pieces is None:
+                continue
+            scale = self.levels[coarse]
+            for piece, tx, ty, image in pieces:
+                source = QRectF(piece.left() * scale - tx * t, piece.top() * scale - ty * t,
+                                piece.width() * scale, piece.height() * scale)
+                painter.drawImage(piece, image, source)
+            return True
+        return False
+
+    def stop(self):
+        self.generation += 1
+        self.pool.clear()
+        self.pool.waitForDone()
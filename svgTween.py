@@ -0,0 +1,149 @@
+from math import pi
+from weakref import ref
+
+from svgLog import gate, event, TRACE
+from svgLazy import lazy_import
+
+np = lazy_import('numpy')
+
+MOVE_EPSILON = 0.0005
+
+
+# every active SvgLayer tween of a view in flat arrays, advanced with one vectorized easing step per frame.
+# per slot: pos (the animator point), p1 (last eased point), p2 (target), tct (easing time), rate (easing length),
+# plus the item geometry needed to write positions back (origin, unscaled size, anchor flag).
+class TweenEngine(object):
+    def __init__(self, capacity=64, reference_fps=60.0):
+        self.reference_fps = reference_fps
+        self.size = 0
+        self.items = []
+        self.free = []
+        # called with the waypoint items a step has moved, e.g. to keep a spatial index current
+        self.moved = None
+        # arrays come with the first tween, a view that has shown nothing yet has not needed numpy
+        self.capacity = 0
+        self.initial_capacity = capacity
+
+    def allocate_arrays(self, capacity):
+        old = self.size
+        arrays = {
+            'pos': np.zeros((capacity, 2)),
+            'p1': np.zeros((capacity, 2)),
+            'p2': np.zeros((capacity, 2)),
+            'origin': np.zeros((capacity, 2)),
+            'extent': np.zeros((capacity, 2)),
+            'tct': np.zeros(capacity),
+            'rate': np.full(capacity, 120.0),
+            'live': np.zeros(capacity, dtype=bool),
+            'anchor': np.zeros(capacity, dtype=bool),
+            'animating': np.zeros(capacity, dtype=bool),
+        }
+        for name, array in arrays.items():
+            if old:
+                array[:old] = getattr(self, name)[:old]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def allocate(self, item):
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == self.capacity:
+                self.allocate_arrays(max(self.capacity * 2, self.initial_capacity))
+            slot = self.size
+            self.size += 1
+            self.items.append(None)
+        self.items[slot] = ref(item) if item is not None else None
+        for name in ('pos', 'p1', 'p2', 'origin', 'extent'):
+            getattr(self, name)[slot] = 0.0
+        self.tct[slot] = 0.0
+        self.rate[slot] = 120.0
+        self.live[slot] = True
+        self.animating[slot] = False
+        self.anchor[slot] = False
+        return slot
+
+    def release(self, slot):
+        self.items[slot] = None
+        self.live[slot] = False
+        self.animating[slot] = False
+        self.free.append(slot)
+
+    # snapshot of the item geometry the write-back needs, taken whenever the animator is reset
+    def capture(self, slot, item):
+        origin = item.origin
+        if origin is not None:
+            self.origin[slot] = (origin.x(), origin.y())
+        self.extent[slot] = (item.width or 0.0, item.height or 0.0)
+        self.anchor[slot] = item.is_anchor
+
+    # one easing step for every live slot (or just `slots`); True while anything still moves
+    def step(self, dt=None, slots=None):
+        n = self.size
+        if n == 0:
+            return False
+        steps = 1.0 if dt is None else dt * self.reference_fps
+
+        if slots is None:
+            a = self.p1[:n] - self.p2[:n]
+            moving = self.live[:n] & (np.hypot(a[:, 0], a[:, 1]) > MOVE_EPSILON)
+            self.animating[:n] = moving
+            self.tct[:n][~moving] = 0.0
+            idx = np.flatnonzero(moving)
+            a = a[moving]
+        else:
+            slots = np.atleast_1d(slots)
+            a = self.p1[slots] - self.p2[slots]
+            moving = self.live[slots] & (np.hypot(a[:, 0], a[:, 1]) > MOVE_EPSILON)
+            self.animating[slots] = moving
+            self.tct[slots[~moving]] = 0.0
+            idx = slots[moving]
+            a = a[moving]
+
+        if idx.size == 0:
+            return False
+
+        tct = self.tct[idx]
+        rate = self.rate[idx]
+        arp = -(np.cos(pi * np.minimum(tct, rate) / rate) - 1.0) / 2.0
+        arp = 1.0 - (1.0 - arp) ** steps
+        pos = self.pos[idx] - a * arp[:, None]
+        self.pos[idx] = pos
+        self.p1[idx] = pos
+        scale = 1.0 + np.sin(pi * (tct * 2.0) / rate)
+        self.tct[idx] = tct + 0.5 * steps
+
+        self.write_back(idx, pos, scale)
+        if gate.trace:
+            event(TRACE, 'tween.step', moving=int(idx.size), steps='%.3f' % steps)
+        return True
+
+    # positions go back to the items in one pass: waypoints pulse their scale and sit centred on the
+    # eased point, the anchor goes through update_view for its viewport clamping
+    def write_back(self, idx, pos, scale):
+        center = pos - self.origin[idx]
+        corner = center - self.extent[idx] * scale[:, None] / 2.0
+        anchor = self.anchor[idx]
+        items = self.items
+        moved = []
+        for k, i in enumerate(idx.tolist()):
+            item_ref = items[i]
+            item = item_ref() if item_ref is not None else None
+            if item is None:
+                continue
+            item.center_x = float(center[k, 0])
+            item.center_y = float(center[k, 1])
+            if anchor[k]:
+                item.update_view()
+            else:
+                item.at_placement = False
+                item.setScale(float(scale[k]))
+                item.setPos(float(corner[k, 0]), float(corner[k, 1]))
+                moved.append(item)
+        if moved and self.moved is not None:
+            self.moved(moved)
+
+    def animating_count(self):
+        if not self.size:
+            return 0
+        return int(np.count_nonzero(self.animating[:self.size]))
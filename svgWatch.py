@@ -0,0 +1,64 @@
+import os
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+
+# one file on disk, reported through changed(path) once it has been quiet for `settle` ms, so a save written in
+# several chunks reloads once. editors that save by renaming a new file over the old one end the watch on the old
+# file; the directory watch notices the new one and the path is watched again
+class FileWatcher(QObject):
+    changed = pyqtSignal(str)
+
+    def __init__(self, parent=None, settle=150):
+        super(FileWatcher, self).__init__(parent)
+        self.path = None
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.touched)
+        self.watcher.directoryChanged.connect(self.touched)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(settle)
+        self.timer.timeout.connect(self.settled)
+        self.last_stat = None
+
+    def watch(self, path):
+        path = os.path.abspath(path)
+        if path == self.path:
+            return
+        self.unwatch()
+        self.path = path
+        self.last_stat = self.stat()
+        self.watcher.addPath(os.path.dirname(path))
+        if os.path.exists(path):
+            self.watcher.addPath(path)
+
+    def unwatch(self):
+        self.timer.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+        self.path = None
+        self.last_stat = None
+
+    def stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def touched(self, path):
+        if self.path is not None:
+            self.timer.start()
+
+    def settled(self):
+        if self.path is None:
+            return
+        if self.path not in self.watcher.files() and os.path.exists(self.path):
+            self.watcher.addPath(self.path)
+        stat = self.stat()
+        # other files of the directory, or a file gone for now
+        if stat is None or stat == self.last_stat:
+            return
+        self.last_stat = stat
+        self.changed.emit(self.path)